@@ -5,26 +5,58 @@ Flask backend that learns opponent assignment patterns from tracked match data
 and predicts the most likely next opponent a player will face.
 """
 
+import bisect
+import fcntl
+import hashlib
+import io
 import logging
 import os
-import pickle
+import queue
+import json
+import shutil
 import re
-from collections import defaultdict, Counter
+import threading
+import time
+import uuid
+from collections import defaultdict, Counter, OrderedDict
+from concurrent.futures import Future
+from contextlib import contextmanager
 from datetime import datetime
+from functools import lru_cache
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
 
 import numpy as np
 import pandas as pd
-from flask import Flask, jsonify, request
+from flask import Flask, jsonify, request, stream_with_context
 from flask_cors import CORS
 
 # ── Configuration ──────────────────────────────────────────────────────────
-MODEL_CACHE_FILE = "model_cache.pkl"
+MODEL_ARTIFACT_DIR = "model_artifact"  # <version>/ dirs of .npy arrays + header.json, opened with mmap
+MODEL_VERSION_MARKER = "CURRENT"  # file in MODEL_ARTIFACT_DIR naming the live version
+MODEL_WRITE_LOCK = ".lock"  # file in MODEL_ARTIFACT_DIR flock'ed by model writers in any process
+MODEL_VERSIONS_KEPT = 3
+ARTIFACT_FORMAT = 6
+MATCH_COUNTS_DIR = "match_counts"  # per-file contributions, keyed by content hash
 MATCH_FILE_PATTERN = "Match-*.csv"
 NUM_PLAYERS = 8
 ALL_PLAYERS = [f"Player {i}" for i in range(1, NUM_PLAYERS + 1)]
 
+# Integer player IDs for the tensor backend: "Player N" → N, 0 = no opponent
+PLAYER_IDS = {name: i for i, name in enumerate(ALL_PLAYERS, start=1)}
+NUM_SLOTS = NUM_PLAYERS + 1
+
+# Opponent label for the ghost (mirror) match in an odd-sized lobby
+GHOST_OPPONENT = "Ghost"
+
+# Prediction backend: "tensor" (dense NumPy arrays) or "dict" (Counter models)
+MODEL_BACKEND = os.environ.get("MODEL_BACKEND", "tensor").lower()
+
+# Queries with eliminations: "drop" scores each seat independently and drops
+# eliminated players; "matching" reconciles the remaining lobby's pairings
+# exactly (see predict_next_opponent_matching)
+ELIMINATION_MODEL = os.environ.get("ELIMINATION_MODEL", "drop").lower()
+
 # Roman → numeric mapping for round parsing
 ROMAN_MAP = {"I": 1, "II": 2, "III": 3, "IV": 4, "V": 5, "VI": 6, "VII": 7}
 
@@ -39,6 +71,44 @@ ROUND_LIST = [
     "IV-1", "IV-2", "IV-3", "IV-4", "IV-5", "IV-6",
     "V-1", "V-2", "V-3", "V-4", "V-5", "V-6",
 ]
+ROUND_INDEX = {label: i for i, label in enumerate(ROUND_LIST)}
+
+# Most queries accepted by one /api/predict-bulk call
+BULK_PREDICT_LIMIT = 100_000
+
+# Queries scored per micro-batch by /api/predict-stream
+STREAM_BATCH_SIZE = 1024
+
+# Opt-in micro-batching of concurrent /api/predict calls (window 0 = off)
+PREDICT_COALESCE_MS = float(os.environ.get("PREDICT_COALESCE_MS", 0))
+PREDICT_COALESCE_MAX_BATCH = int(os.environ.get("PREDICT_COALESCE_MAX_BATCH", 256))
+
+# Rendered /api/predict results kept per process (0 = no caching)
+PREDICTION_CACHE_SIZE = int(os.environ.get("PREDICTION_CACHE_SIZE", 50_000))
+
+# Cache-Control for GET bodies fixed by the code vs. by the model version
+STATIC_CACHE_CONTROL = "public, max-age=86400"
+MODEL_CACHE_CONTROL = f"public, max-age={int(os.environ.get('MODEL_CACHE_MAX_AGE', 60))}, must-revalidate"
+
+# Game sessions: idle lifetime and the most kept per process
+SESSION_TTL_SECONDS = int(os.environ.get("SESSION_TTL_SECONDS", 2 * 60 * 60))
+MAX_SESSIONS = int(os.environ.get("MAX_SESSIONS", 10_000))
+
+# Session event streams: idle heartbeat interval and per-subscriber backlog
+SSE_HEARTBEAT_SECONDS = int(os.environ.get("SSE_HEARTBEAT_SECONDS", 15))
+SSE_QUEUE_SIZE = 16
+
+# Most open event streams per worker process; further subscribers get 503.
+# Under a threaded WSGI server each open stream occupies one server thread,
+# so keep this below the thread count (asgi.py serves streams on its event loop).
+SSE_MAX_SUBSCRIBERS = int(os.environ.get("SSE_MAX_SUBSCRIBERS", 64))
+
+# Serialises writers of the live models (rebuilds and match ingestion)
+# within a process; model_writer() adds the cross-process file lock
+model_lock = threading.Lock()
+
+# How often a worker stats the version marker for models published elsewhere
+MODEL_CHECK_INTERVAL_MS = int(os.environ.get("MODEL_CHECK_INTERVAL_MS", 1000))
 
 # ── Logging Setup ──────────────────────────────────────────────────────────
 logging.basicConfig(
@@ -67,8 +137,8 @@ def round_to_absolute_index(round_str: str) -> int:
         'V-4'   → 25
         'V-6'   → 27
     """
-    if round_str in ROUND_LIST:
-        return ROUND_LIST.index(round_str)
+    if round_str in ROUND_INDEX:
+        return ROUND_INDEX[round_str]
     # Fallback: try to parse with regex
     match = re.match(r"([IV]+)-(\d+)", round_str.strip())
     if not match:
@@ -92,6 +162,69 @@ def get_next_round(current_round: str) -> Optional[str]:
     return None
 
 
+# ═══════════════════════════════════════════════════════════════════════════
+#  LOBBY MATCHINGS
+# ═══════════════════════════════════════════════════════════════════════════
+
+@lru_cache(maxsize=512)
+def perfect_matchings(nodes: Tuple[int, ...]) -> np.ndarray:
+    """Every way to pair up *nodes* (an even count) as a [M, len/2, 2] array."""
+    if not nodes:
+        return np.zeros((1, 0, 2), dtype=np.intp)
+    first, rest = nodes[0], nodes[1:]
+    matchings = []
+    for k, partner in enumerate(rest):
+        for sub in perfect_matchings(rest[:k] + rest[k + 1:]):
+            matchings.append([(first, partner), *sub.tolist()])
+    return np.array(matchings, dtype=np.intp)
+
+
+def _matching_table() -> np.ndarray:
+    """Every pairing of the eight seats as [matching_id, seat] → opponent ID."""
+    pairs = perfect_matchings(tuple(range(1, NUM_SLOTS)))
+    table = np.zeros((len(pairs), NUM_SLOTS), dtype=np.uint8)
+    rows = np.arange(len(pairs))[:, None]
+    table[rows, pairs[..., 0]] = pairs[..., 1]
+    table[rows, pairs[..., 1]] = pairs[..., 0]
+    return table
+
+
+# A full-lobby round is one of only 105 pairings; MATCHINGS[m, s] is the
+# opponent of seat s (column 0 unused) under matching ID m
+MATCHINGS = _matching_table()
+NUM_MATCHINGS = len(MATCHINGS)
+
+# Opponent rows encoded as base-NUM_SLOTS integers, sorted for lookup
+_MATCHING_RADIX = NUM_SLOTS ** np.arange(NUM_PLAYERS, dtype=np.int64)
+_MATCHING_CODES = MATCHINGS[:, 1:].astype(np.int64) @ _MATCHING_RADIX
+_MATCHING_CODE_ORDER = np.argsort(_MATCHING_CODES)
+_MATCHING_CODES_SORTED = _MATCHING_CODES[_MATCHING_CODE_ORDER]
+
+# [matching, seat, opponent] incidence: projects a distribution over
+# matchings onto per-seat opponent distributions
+MATCHING_PROJECTION = np.zeros((NUM_MATCHINGS, NUM_SLOTS, NUM_SLOTS))
+MATCHING_PROJECTION[
+    np.arange(NUM_MATCHINGS)[:, None], np.arange(1, NUM_SLOTS), MATCHINGS[:, 1:]
+] = 1.0
+
+# 0-based stage of each absolute round (the matching model is kept per stage)
+ROUND_STAGE = np.array([ROMAN_MAP[label.split("-")[0]] - 1 for label in ROUND_LIST], dtype=np.intp)
+NUM_STAGES = len(ROUNDS_PER_STAGE)
+
+
+def matching_ids(rounds: np.ndarray) -> np.ndarray:
+    """Matching ID of each [..., seat] opponent row, or -1 if it is not a full pairing."""
+    codes = np.asarray(rounds).astype(np.int64) @ _MATCHING_RADIX
+    pos = np.minimum(np.searchsorted(_MATCHING_CODES_SORTED, codes), NUM_MATCHINGS - 1)
+    return np.where(_MATCHING_CODES_SORTED[pos] == codes, _MATCHING_CODE_ORDER[pos], -1)
+
+
+def matching_pairs(matching_id: int) -> List[List[str]]:
+    """The pairs of a matching ID as [["Player 1", "Player 5"], ...]."""
+    opp = MATCHINGS[matching_id]
+    return [[ALL_PLAYERS[s - 1], ALL_PLAYERS[opp[s] - 1]] for s in range(1, NUM_SLOTS) if s < opp[s]]
+
+
 # ═══════════════════════════════════════════════════════════════════════════
 #  DATA CLEANING
 # ═══════════════════════════════════════════════════════════════════════════
@@ -123,6 +256,43 @@ def clean_dataframe(df: pd.DataFrame) -> pd.DataFrame:
     return df
 
 
+def validate_match(df: pd.DataFrame) -> List[str]:
+    """Check a raw (uncleaned) match DataFrame against the Template Match.csv layout.
+
+    Returns a list of human-readable problems; empty means the match is usable.
+    """
+    errors: List[str] = []
+    players = [str(c).strip() for c in df.columns[1:]]
+    if players != ALL_PLAYERS:
+        return [f"Columns after the round label must be exactly {ALL_PLAYERS}"]
+
+    labels = [str(v).strip() for v in df.iloc[:, 0]]
+    unknown = [label for label in labels if label not in ROUND_LIST]
+    if unknown:
+        errors.append(f"Invalid round label(s) {unknown}. Must be one of {ROUND_LIST}")
+    duplicates = sorted({label for label in labels if labels.count(label) > 1})
+    if duplicates:
+        errors.append(f"Duplicate round label(s) {duplicates}")
+
+    fights = 0
+    for label, row in zip(labels, df.iloc[:, 1:].itertuples(index=False, name=None)):
+        for player, raw in zip(ALL_PLAYERS, row):
+            opp = clean_opponent_name(raw)
+            if opp is None:
+                if not (pd.isna(raw) or str(raw).strip() in ("", "Creep", "Null")):
+                    errors.append(f"{label} / {player}: unrecognised opponent {raw!r}")
+            elif opp not in PLAYER_IDS:
+                errors.append(f"{label} / {player}: unknown player {raw!r}")
+            elif opp == player:
+                errors.append(f"{label} / {player}: a player cannot face themselves")
+            else:
+                fights += 1
+
+    if not fights and not errors:
+        errors.append("Match contains no recorded fights")
+    return errors
+
+
 # ═══════════════════════════════════════════════════════════════════════════
 #  DATA LOADING
 # ═══════════════════════════════════════════════════════════════════════════
@@ -138,100 +308,498 @@ def discover_match_files(base_dir: str = ".") -> List[str]:
     return files
 
 
-def load_training_data(base_dir: str = ".") -> List[pd.DataFrame]:
-    """Load and clean all match CSV files."""
-    matches: List[pd.DataFrame] = []
-    files = discover_match_files(base_dir)
-    log.info("Found %d match file(s): %s", len(files), [Path(f).name for f in files])
+def encode_match(df: pd.DataFrame) -> np.ndarray:
+    """Encode a cleaned match DataFrame as a uint8 (round × seat) matrix.
+
+    Cell [r, s] holds the ID of the opponent "Player s+1" faced at absolute
+    round r, or 0 when there was no fight (Creep round, eliminated, or the
+    round was not played). Columns that are not player names are ignored.
+    """
+    matrix = np.zeros((len(ROUND_LIST), NUM_PLAYERS), dtype=np.uint8)
+    seats = [
+        (col_pos, PLAYER_IDS[col] - 1)
+        for col_pos, col in enumerate(df.columns)
+        if col_pos > 0 and col in PLAYER_IDS
+    ]
+    for row in df.itertuples(index=False, name=None):
+        if not isinstance(row[0], str):
+            continue
+        idx = round_to_absolute_index(row[0])
+        if not 0 <= idx < len(ROUND_LIST):
+            continue
+        for col_pos, seat in seats:
+            matrix[idx, seat] = PLAYER_IDS.get(row[col_pos], 0)
+    return matrix
+
+
+def fingerprint_file(path: str, previous: Optional[dict] = None) -> dict:
+    """Return {size, mtime, sha256} for a file.
+
+    If *previous* has the same size and mtime the file is assumed unchanged
+    and its hash is reused; otherwise the content is hashed.
+    """
+    st = os.stat(path)
+    if previous and previous["size"] == st.st_size and previous["mtime"] == st.st_mtime_ns:
+        return previous
+    with open(path, "rb") as f:
+        digest = hashlib.sha256(f.read()).hexdigest()
+    return {"size": st.st_size, "mtime": st.st_mtime_ns, "sha256": digest}
+
+
+def load_match_file(filepath: str) -> Optional[np.ndarray]:
+    """Read, clean and encode one match CSV; None if it cannot be loaded."""
+    try:
+        df = pd.read_csv(filepath)
+        df = clean_dataframe(df)
+        return encode_match(df)
+    except FileNotFoundError:
+        log.warning("File not found: %s", filepath)
+    except Exception:
+        log.exception("Error loading %s", filepath)
+    return None
+
 
-    for filepath in files:
+def scan_match_files(
+    base_dir: str = ".",
+    previous: Optional[Dict[str, dict]] = None,
+) -> Dict[str, dict]:
+    """Fingerprint every match file; returns file name → {size, mtime, sha256}.
+
+    Entries in *previous* let unchanged files skip re-hashing.
+    """
+    previous = previous or {}
+    manifest: Dict[str, dict] = {}
+    for filepath in discover_match_files(base_dir):
+        name = Path(filepath).name
         try:
-            df = pd.read_csv(filepath)
-            df = clean_dataframe(df)
-            matches.append(df)
-        except FileNotFoundError:
-            log.warning("File not found: %s", filepath)
-        except Exception:
-            log.exception("Error loading %s", filepath)
+            manifest[name] = fingerprint_file(filepath, previous.get(name))
+        except OSError:
+            log.exception("Error reading %s", filepath)
+    return manifest
+
+
+def manifest_changed(old: Dict[str, dict], new: Dict[str, dict]) -> bool:
+    """True if the set of match files or any file's content differs."""
+    return {k: v["sha256"] for k, v in old.items()} != {k: v["sha256"] for k, v in new.items()}
+
 
-    log.info("Loaded %d match(es) successfully.", len(matches))
-    return matches
+def save_match_file(csv_text: str, base_dir: str = ".") -> str:
+    """Write a match CSV as the next free Match-N.csv and return its path."""
+    numbers = [int(n) for f in discover_match_files(base_dir) for n in re.findall(r"(\d+)", Path(f).name)]
+    n = max(numbers, default=0) + 1
+    while True:
+        path = Path(base_dir) / MATCH_FILE_PATTERN.replace("*", str(n))
+        try:
+            with open(path, "x", encoding="utf-8", newline="") as f:
+                f.write(csv_text)
+            return str(path)
+        except FileExistsError:
+            n += 1
 
 
 # ═══════════════════════════════════════════════════════════════════════════
 #  MODEL BUILDING
 # ═══════════════════════════════════════════════════════════════════════════
 
-def build_models(matches: List[pd.DataFrame]):
-    """Build transition, position, and bigram models from cleaned match data.
+# Matches counted per vectorised pass (bounds the intermediate index arrays)
+BUILD_CHUNK_SIZE = 8192
+
+
+def _count_cells(flat_index: np.ndarray, shape: Tuple[int, ...]) -> np.ndarray:
+    """Histogram raveled multi-indices into an array of the given shape."""
+    size = int(np.prod(shape))
+    return np.bincount(flat_index.ravel(), minlength=size).reshape(shape)
+
+
+def count_matchings(matches: np.ndarray) -> np.ndarray:
+    """Raveled [stage, matching, next_matching] index of each matching transition.
+
+    *matches* is one encoded match or a stack of them. A round is observed
+    when it pairs up all eight seats; its successor is the next round with
+    any fight in it, so Creep rounds are skipped rather than breaking the
+    chain. Transitions are keyed by the stage of the earlier round.
+    """
+    num_rounds = len(ROUND_LIST)
+    matches = np.asarray(matches, dtype=np.uint8).reshape(-1, num_rounds, NUM_PLAYERS)
+    ids = matching_ids(matches)
+    fought = np.where(matches.any(axis=-1), np.arange(num_rounds), num_rounds)
+    first_fought = np.minimum.accumulate(fought[:, ::-1], axis=1)[:, ::-1]  # first fought round ≥ r
+    successor = np.concatenate([first_fought[:, 1:], np.full((len(ids), 1), num_rounds)], axis=1)
+    next_ids = np.concatenate([ids, np.full((len(ids), 1), -1)], axis=1)
+    next_ids = np.take_along_axis(next_ids, successor, axis=1)
+    flat = (ROUND_STAGE * NUM_MATCHINGS + ids) * NUM_MATCHINGS + next_ids
+    return flat[(ids >= 0) & (next_ids >= 0)]
+
+
+def count_rematches(matches: np.ndarray) -> np.ndarray:
+    """Raveled [lobby_size, rematch] index of each fight with two earlier fights.
+
+    *matches* is one encoded match or a stack of them. Each seat's fights
+    are its rounds with an opponent, in order (Creep rounds are skipped).
+    rematch is 1 when the opponent is the seat's last one, 2 when it is the
+    one before (and not the last), else 0. lobby_size is the number of
+    seats fighting in that round.
+    """
+    num_rounds = len(ROUND_LIST)
+    matches = np.asarray(matches, dtype=np.uint8).reshape(-1, num_rounds, NUM_PLAYERS)
+    fought = matches > 0
+    rounds = np.arange(num_rounds)[:, None]
+
+    # latest[:, r] = each seat's latest fight round before r (-1 if none)
+    seen = np.maximum.accumulate(np.where(fought, rounds, -1), axis=1)
+    latest = np.concatenate([np.full_like(seen[:, :1], -1), seen[:, :-1]], axis=1)
+    last = latest
+    prev = np.take_along_axis(latest, np.maximum(last, 0), axis=1)
+    prev[last < 0] = -1
+
+    def opponent_at(idx: np.ndarray) -> np.ndarray:
+        return np.take_along_axis(matches, np.maximum(idx, 0), axis=1)
+
+    rematch = np.where(matches == opponent_at(last), 1, np.where(matches == opponent_at(prev), 2, 0))
+    lobby_size = fought.sum(axis=-1, keepdims=True)
+    flat = np.broadcast_to(lobby_size, matches.shape) * 3 + rematch
+    return flat[fought & (prev >= 0)]
+
+
+def count_cycle_repeats(matches: np.ndarray) -> np.ndarray:
+    """Raveled [gap, repeat] index for each pair of a seat's full-lobby fights gap apart.
+
+    *matches* is one encoded match or a stack of them. Each seat's fights
+    are its rounds with an opponent, in order. Two fights gap (1 to
+    NUM_PLAYERS - 1) apart count when every seat fought in both rounds;
+    repeat is 1 if the opponent was the same.
+    """
+    num_rounds = len(ROUND_LIST)
+    matches = np.asarray(matches, dtype=np.uint8).reshape(-1, num_rounds, NUM_PLAYERS)
+    fought = matches > 0
+    full = fought.all(axis=-1, keepdims=True)
+    order = np.argsort(~fought, axis=1, kind="stable")  # each seat's fight rounds first
+    opp = np.take_along_axis(matches, order, axis=1)
+    counted = np.take_along_axis(fought & full, order, axis=1)
+
+    flat = []
+    for gap in range(1, NUM_PLAYERS):
+        both = counted[:, gap:] & counted[:, :-gap]
+        repeat = opp[:, gap:] == opp[:, :-gap]
+        flat.append((gap * 2 + repeat)[both])
+    return np.concatenate(flat)
+
+
+def build_models(matches: np.ndarray):
+    """Count transition, position, bigram and matching tensors from encoded matches.
+
+    Every count is a histogram over shifted views of the (match × round ×
+    seat) matrix, taken in chunks. Cells involving ID 0 ("no opponent") are
+    counted along with everything else and zeroed at the end, which is
+    cheaper than masking them out first.
+
+    Returns:
+        transition:       [player, last, next] counts
+        position:         [player, round_absolute_idx, opponent] counts
+        bigram:           [player, prev, last, next] counts
+        matching:         [stage, matching, next_matching] counts (see count_matchings)
+        rematch:          [lobby_size, rematch] counts (see count_rematches)
+        cycle:            [gap, repeat] counts (see count_cycle_repeats)
+        player_survival:  [match, round_absolute_idx] uint8 bitmask of alive seats
+    """
+    num_rounds = len(ROUND_LIST)
+    matches = np.asarray(matches, dtype=np.uint8).reshape(-1, num_rounds, NUM_PLAYERS)
+    transition = np.zeros((NUM_SLOTS, NUM_SLOTS, NUM_SLOTS), dtype=np.int64)
+    position = np.zeros((NUM_SLOTS, num_rounds, NUM_SLOTS), dtype=np.int64)
+    bigram = np.zeros((NUM_SLOTS, NUM_SLOTS, NUM_SLOTS, NUM_SLOTS), dtype=np.int64)
+    matching = np.zeros((NUM_STAGES, NUM_MATCHINGS, NUM_MATCHINGS), dtype=np.int64)
+    rematch = np.zeros((NUM_SLOTS, 3), dtype=np.int64)
+    cycle = np.zeros((NUM_PLAYERS, 2), dtype=np.int64)
+
+    player = np.arange(1, NUM_SLOTS)  # broadcasts along the seat axis
+    rounds = np.arange(num_rounds)[:, None]
+
+    for start in range(0, len(matches), BUILD_CHUNK_SIZE):
+        chunk = matches[start:start + BUILD_CHUNK_SIZE].astype(np.intp)
+        prev, curr, nxt = chunk[:, :-2], chunk[:, 1:-1], chunk[:, 2:]
+
+        position += _count_cells((player * num_rounds + rounds) * NUM_SLOTS + chunk, position.shape)
+        transition += _count_cells(
+            (player * NUM_SLOTS + chunk[:, :-1]) * NUM_SLOTS + chunk[:, 1:], transition.shape,
+        )
+        bigram += _count_cells(
+            ((player * NUM_SLOTS + prev) * NUM_SLOTS + curr) * NUM_SLOTS + nxt, bigram.shape,
+        )
+        matching += _count_cells(count_matchings(chunk), matching.shape)
+        rematch += _count_cells(count_rematches(chunk), rematch.shape)
+        cycle += _count_cells(count_cycle_repeats(chunk), cycle.shape)
+
+    transition[:, 0, :] = 0
+    transition[:, :, 0] = 0
+    position[:, :, 0] = 0
+    position[np.arange(NUM_SLOTS), :, np.arange(NUM_SLOTS)] = 0  # a player never faces itself
+    bigram[:, 0] = 0
+    bigram[:, :, 0] = 0
+    bigram[:, :, :, 0] = 0
+
+    player_survival = np.packbits(matches > 0, axis=-1, bitorder="little")[..., 0]
+    return transition, position, bigram, matching, rematch, cycle, player_survival
+
+
+class MatchCounts(NamedTuple):
+    """One match's contribution to the models.
+
+    The count fields hold one raveled tensor index per observation (see
+    build_models for the tensor layouts), so a contribution is a few hundred
+    bytes and can be added to or subtracted from the totals directly.
+    """
+    matrix: np.ndarray      # encoded match, [round, seat]
+    survival: np.ndarray    # [round] uint8 bitmask of alive seats
+    transition: np.ndarray
+    position: np.ndarray
+    bigram: np.ndarray
+    matching: np.ndarray
+    rematch: np.ndarray
+    cycle: np.ndarray
+
+
+def count_match(matrix: np.ndarray) -> MatchCounts:
+    """Compute one encoded match's observations (same rules as build_models)."""
+    num_rounds = len(ROUND_LIST)
+    m = np.asarray(matrix, dtype=np.uint8).reshape(num_rounds, NUM_PLAYERS)
+    opp = m.astype(np.intp)
+    player = np.arange(1, NUM_SLOTS)
+    rounds = np.arange(num_rounds)[:, None]
+    prev, curr, nxt = opp[:-2], opp[1:-1], opp[2:]
+
+    position = (player * num_rounds + rounds) * NUM_SLOTS + opp
+    position = position[(opp > 0) & (opp != player)]
+    transition = (player * NUM_SLOTS + opp[:-1]) * NUM_SLOTS + opp[1:]
+    transition = transition[(opp[:-1] > 0) & (opp[1:] > 0)]
+    bigram = ((player * NUM_SLOTS + prev) * NUM_SLOTS + curr) * NUM_SLOTS + nxt
+    bigram = bigram[(prev > 0) & (curr > 0) & (nxt > 0)]
+
+    return MatchCounts(
+        matrix=m,
+        survival=np.packbits(m > 0, axis=-1, bitorder="little")[:, 0],
+        transition=transition.astype(np.uint16),
+        position=position.astype(np.uint16),
+        bigram=bigram.astype(np.uint16),
+        matching=count_matchings(m).astype(np.uint16),
+        rematch=count_rematches(m).astype(np.uint16),
+        cycle=count_cycle_repeats(m).astype(np.uint16),
+    )
+
+
+def combine_match_counts(counts: List[MatchCounts]):
+    """Sum per-match contributions into the same outputs as build_models."""
+    num_rounds = len(ROUND_LIST)
+    shapes = {
+        "transition": (NUM_SLOTS, NUM_SLOTS, NUM_SLOTS),
+        "position": (NUM_SLOTS, num_rounds, NUM_SLOTS),
+        "bigram": (NUM_SLOTS, NUM_SLOTS, NUM_SLOTS, NUM_SLOTS),
+        "matching": (NUM_STAGES, NUM_MATCHINGS, NUM_MATCHINGS),
+        "rematch": (NUM_SLOTS, 3),
+        "cycle": (NUM_PLAYERS, 2),
+    }
+    totals = {}
+    for field, shape in shapes.items():
+        obs = [getattr(c, field) for c in counts]
+        flat = np.concatenate(obs).astype(np.intp) if obs else np.zeros(0, dtype=np.intp)
+        totals[field] = _count_cells(flat, shape).astype(np.int64)
+    survival = (
+        np.stack([c.survival for c in counts]) if counts
+        else np.zeros((0, num_rounds), dtype=np.uint8)
+    )
+    return (
+        totals["transition"], totals["position"], totals["bigram"],
+        totals["matching"], totals["rematch"], totals["cycle"], survival,
+    )
+
+
+def apply_match_counts(
+    transition: np.ndarray,
+    position: np.ndarray,
+    bigram: np.ndarray,
+    matching: np.ndarray,
+    rematch: np.ndarray,
+    cycle: np.ndarray,
+    counts: MatchCounts,
+    sign: int = 1,
+) -> None:
+    """Add (sign=1) or subtract (sign=-1) one match's observations in place."""
+    np.add.at(transition.reshape(-1), counts.transition.astype(np.intp), sign)
+    np.add.at(position.reshape(-1), counts.position.astype(np.intp), sign)
+    np.add.at(bigram.reshape(-1), counts.bigram.astype(np.intp), sign)
+    np.add.at(matching.reshape(-1), counts.matching.astype(np.intp), sign)
+    np.add.at(rematch.reshape(-1), counts.rematch.astype(np.intp), sign)
+    np.add.at(cycle.reshape(-1), counts.cycle.astype(np.intp), sign)
+
+
+def build_dict_models(
+    transition: np.ndarray,
+    position: np.ndarray,
+    bigram: np.ndarray,
+):
+    """Expand count tensors into the dict-of-Counter models.
 
     Returns:
         transition_model:  (player, last_opponent) → Counter[next_opponent]
         position_model:    (player, round_absolute_idx) → Counter[opponent]
         bigram_model:      (player, prev_opp, curr_opp) → Counter[next_opp]
-        player_survival:   dict[round_label] → set of alive players (per match)
     """
     transition_model: Dict[Tuple[str, str], Counter] = defaultdict(Counter)
     position_model: Dict[Tuple[str, int], Counter] = defaultdict(Counter)
     bigram_model: Dict[Tuple[str, str, str], Counter] = defaultdict(Counter)
-    player_survival: List[Dict[str, set]] = []  # per-match survival
-
-    for match_df in matches:
-        players = list(match_df.columns[1:])
-        round_labels = match_df.iloc[:, 0].tolist()
-
-        # Track which players are alive at each round in this match
-        match_alive: Dict[str, set] = {}
-
-        for round_pos, round_label in enumerate(round_labels):
-            alive_this_round = set()
-            for player in players:
-                raw = match_df.at[round_pos, player] if round_pos < len(match_df) else None
-                opp = clean_opponent_name(raw)
-                if opp is not None:
-                    alive_this_round.add(player)
-            match_alive[round_label] = alive_this_round
-
-            # Position model: at this round index, who does each player face?
-            for player in players:
-                raw = match_df.at[round_pos, player]
-                opp = clean_opponent_name(raw)
-                if opp and opp != player:
-                    abs_idx = round_to_absolute_index(round_label)
-                    position_model[(player, abs_idx)][opp] += 1
-
-        player_survival.append(match_alive)
-
-        # Transition & bigram models
-        for player in players:
-            opponents: List[Optional[str]] = []
-            for round_pos in range(len(round_labels)):
-                raw = match_df.at[round_pos, player]
-                opponents.append(clean_opponent_name(raw))
-
-            for i in range(len(opponents) - 1):
-                curr = opponents[i]
-                nxt = opponents[i + 1]
-                if curr is None or nxt is None:
-                    continue
-                # Single-step transition
-                transition_model[(player, curr)][nxt] += 1
 
-                # Bigram (2-step context)
-                if i >= 1:
-                    prev = opponents[i - 1]
-                    if prev is not None:
-                        bigram_model[(player, prev, curr)][nxt] += 1
+    def name(i: int) -> str:
+        return ALL_PLAYERS[i - 1]
+
+    for p, last, nxt in np.argwhere(transition).tolist():
+        transition_model[(name(p), name(last))][name(nxt)] = int(transition[p, last, nxt])
+    for p, idx, opp in np.argwhere(position).tolist():
+        position_model[(name(p), idx)][name(opp)] = int(position[p, idx, opp])
+    for p, prev, last, nxt in np.argwhere(bigram).tolist():
+        bigram_model[(name(p), name(prev), name(last))][name(nxt)] = int(bigram[p, prev, last, nxt])
+
+    return transition_model, position_model, bigram_model
+
+
+# ═══════════════════════════════════════════════════════════════════════════
+#  PER-FILE COUNT CACHE
+# ═══════════════════════════════════════════════════════════════════════════
+
+def _match_counts_path(sha256: str, counts_dir: str = MATCH_COUNTS_DIR) -> Path:
+    return Path(counts_dir) / f"{sha256}.npz"
+
+
+def save_match_counts(counts: MatchCounts, sha256: str, counts_dir: str = MATCH_COUNTS_DIR) -> None:
+    """Store one file's contribution as <counts_dir>/<sha256>.npz.
+
+    Entries are content-addressed, so one that already exists is left as
+    is. Each writer uses its own temporary name, so workers booting
+    together into an empty cache cannot trip over each other's files.
+    """
+    path = _match_counts_path(sha256, counts_dir)
+    if path.exists():
+        return
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{sha256}.tmp-{os.getpid()}-{uuid.uuid4().hex}.npz")
+    try:
+        np.savez(tmp, **counts._asdict())
+        os.replace(tmp, path)
+    finally:
+        tmp.unlink(missing_ok=True)
+
+
+def load_match_counts(sha256: str, counts_dir: str = MATCH_COUNTS_DIR) -> Optional[MatchCounts]:
+    """Load a cached contribution by content hash, or None if absent/unreadable."""
+    path = _match_counts_path(sha256, counts_dir)
+    if not path.exists():
+        return None
+    try:
+        with np.load(path) as data:
+            if not set(MatchCounts._fields) <= set(data.files):
+                return None  # written before a field was added; recount
+            return MatchCounts(**{field: data[field] for field in MatchCounts._fields})
+    except Exception:
+        log.exception("Ignoring unreadable count cache %s", path)
+        return None
+
+
+def get_match_counts(filepath: str, sha256: str) -> Optional[MatchCounts]:
+    """Return a file's contribution, parsing it only if no cached copy exists."""
+    counts = load_match_counts(sha256)
+    if counts is None:
+        matrix = load_match_file(filepath)
+        if matrix is None:
+            return None
+        counts = count_match(matrix)
+        save_match_counts(counts, sha256)
+    return counts
+
+
+def load_training_data(
+    base_dir: str = ".",
+    manifest: Optional[Dict[str, dict]] = None,
+) -> Tuple[Dict[str, dict], List[MatchCounts]]:
+    """Load every match file's contribution, from the count cache where possible.
+
+    Returns the manifest of files that loaded (in discovery order) and
+    their contributions in the same order.
+    """
+    if manifest is None:
+        manifest = scan_match_files(base_dir)
+    log.info("Found %d match file(s): %s", len(manifest), list(manifest))
+
+    loaded: Dict[str, dict] = {}
+    counts: List[MatchCounts] = []
+    for name, fp in manifest.items():
+        c = get_match_counts(str(Path(base_dir) / name), fp["sha256"])
+        if c is not None:
+            loaded[name] = fp
+            counts.append(c)
+
+    log.info("Loaded %d match(es) successfully.", len(counts))
+    return loaded, counts
+
+
+def apply_manifest_delta(
+    models: Tuple[np.ndarray, ...],
+    old: Dict[str, dict],
+    new: Dict[str, dict],
+    base_dir: str = ".",
+):
+    """Move count tensors built from *old* to match the files in *new*.
+
+    Files removed or modified since *old* have their cached contribution
+    subtracted; new or modified files have theirs added (parsing only those
+    without a cached contribution). Survival rows follow manifest order.
+
+    Returns (transition, position, bigram, matching, rematch, cycle, survival,
+    manifest actually loaded),
+    or None if an old contribution is missing and a full rebuild is needed.
+    """
+    transition, position, bigram, matching, rematch, cycle, survival = (np.array(a) for a in models)
+    rows = dict(zip(old, survival))
 
-    return transition_model, position_model, bigram_model, player_survival
+    for name, fp in old.items():
+        if name in new and new[name]["sha256"] == fp["sha256"]:
+            continue
+        counts = load_match_counts(fp["sha256"])
+        if counts is None:
+            return None
+        apply_match_counts(transition, position, bigram, matching, rematch, cycle, counts, sign=-1)
+        del rows[name]
+
+    loaded: Dict[str, dict] = {}
+    for name, fp in new.items():
+        if name not in rows:
+            counts = get_match_counts(str(Path(base_dir) / name), fp["sha256"])
+            if counts is None:
+                continue
+            apply_match_counts(transition, position, bigram, matching, rematch, cycle, counts)
+            rows[name] = counts.survival
+        loaded[name] = fp
+
+    survival = (
+        np.stack([rows[name] for name in loaded]) if loaded
+        else np.zeros((0, len(ROUND_LIST)), dtype=np.uint8)
+    )
+    return transition, position, bigram, matching, rematch, cycle, survival, loaded
 
 
 # ═══════════════════════════════════════════════════════════════════════════
 #  ALIVE-PLAYER ESTIMATOR
 # ═══════════════════════════════════════════════════════════════════════════
 
+def count_alive(player_survival_data: np.ndarray) -> np.ndarray:
+    """Sum survival bitmasks into [round, seat] counts of matches where alive."""
+    alive = np.unpackbits(
+        np.asarray(player_survival_data, dtype=np.uint8).reshape(-1, len(ROUND_LIST))[..., None],
+        axis=-1, count=NUM_PLAYERS, bitorder="little",
+    )
+    return alive.sum(axis=0, dtype=np.int64)
+
+
 def compute_round_alive_estimates(
-    player_survival_data: List[Dict[str, set]],
+    alive_counts: np.ndarray,
+    total: int,
     threshold: float = 0.5,
 ) -> Dict[int, set]:
     """For each absolute round index, estimate which players are typically alive.
@@ -241,66 +809,477 @@ def compute_round_alive_estimates(
 
     This feeds into the prediction engine so that eliminated players are
     deprioritised and alive-but-unseen opponents get a fair baseline weight.
+
+    Args:
+        alive_counts: [round, seat] match counts from count_alive.
+        total:        number of matches those counts cover.
     """
-    if not player_survival_data:
+    if total == 0:
         return {}
 
-    total = len(player_survival_data)
-    # round_label -> player -> count of matches where alive
-    raw: Dict[str, Counter] = defaultdict(Counter)
-
-    for match_alive in player_survival_data:
-        for round_label, alive_set in match_alive.items():
-            for player_name in alive_set:
-                raw[round_label][player_name] += 1
-
     estimates: Dict[int, set] = {}
-    for round_label, counter in raw.items():
-        idx = round_to_absolute_index(round_label)
-        alive = {p for p, c in counter.items() if c / total > threshold}
-        estimates[idx] = alive
+    for idx in np.flatnonzero(alive_counts.any(axis=1)).tolist():
+        alive = np.flatnonzero(alive_counts[idx] / total > threshold).tolist()
+        estimates[idx] = {ALL_PLAYERS[s] for s in alive}
 
     return estimates
 
 
+def smallest_lobby_sizes(player_survival_data: np.ndarray) -> np.ndarray:
+    """The fewest players seen fighting at each absolute round, over matches still running then.
+
+    Rounds no match reached (and Creep rounds) are 0.
+    """
+    survival = np.asarray(player_survival_data, dtype=np.uint8).reshape(-1, len(ROUND_LIST))
+    sizes = np.unpackbits(survival[..., None], axis=-1).sum(axis=-1)
+    running = sizes > 0
+    return np.where(running.any(axis=0), np.where(running, sizes, NUM_PLAYERS).min(axis=0), 0).astype(np.int8)
+
+
+# ═══════════════════════════════════════════════════════════════════════════
+#  MATCHMAKING RULES
+# ═══════════════════════════════════════════════════════════════════════════
+
+# A rematch window becomes a hard rule when rematches inside it make up at
+# most this share of a lobby size's fights (so one mislabelled CSV row
+# cannot veto it), and only with at least REMATCH_MIN_SUPPORT fights seen
+REMATCH_TOLERANCE = 0.01
+REMATCH_MIN_SUPPORT = 20
+
+
+def compile_rematch_windows(rematch: np.ndarray) -> np.ndarray:
+    """Learn, per lobby size, how many of a seat's latest opponents it never faces next.
+
+    *rematch* holds [lobby_size, rematch] counts (see count_rematches).
+    The window is 2 when neither of the last two opponents is faced again,
+    1 when only the last one is ruled out, and 0 when rematches happen.
+    Queries carry two rounds of history, so wider windows (such as "face
+    everyone before repeating") apply as far as that history reaches.
+    """
+    rematch = np.asarray(rematch, dtype=np.int64)
+    support = rematch.sum(axis=1)
+    within = np.cumsum(rematch[:, 1:], axis=1)  # rematches of the last, of the last two
+    holds = (support[:, None] >= REMATCH_MIN_SUPPORT) & (within <= REMATCH_TOLERANCE * support[:, None])
+    return np.where(holds[:, 1], 2, np.where(holds[:, 0], 1, 0)).astype(np.int8)
+
+
+def forbidden_opponents(
+    tm: "TensorModels",
+    player: int,
+    next_idx: int,
+    last: int,
+    previous: int,
+    eliminated: int,
+) -> int:
+    """Bitmask (as eliminated_mask) of opponents the rematch rules rule out.
+
+    The lobby size is the players not *eliminated*, capped by the smallest
+    lobby the corpus has seen at *next_idx* (tm.lobby_size). Eliminations
+    are optional in queries, so without the cap an endgame query that omits
+    them would be held to full-lobby rules. With an unknown lobby size, or
+    if the rules would leave no candidate, none are applied.
+    """
+    size = NUM_PLAYERS - bin(eliminated).count("1")
+    if 0 <= next_idx < len(ROUND_LIST):
+        size = min(size, int(tm.lobby_size[next_idx]))
+    window = int(tm.rematch_window[size])
+    forbidden = 0
+    if window >= 1 and last:
+        forbidden |= 1 << (last - 1)
+    if window >= 2 and previous:
+        forbidden |= 1 << (previous - 1)
+    candidates = ((1 << NUM_PLAYERS) - 1) & ~eliminated & ~(1 << (player - 1) if player else 0)
+    return forbidden if candidates & ~forbidden else 0
+
+
+def forbidden_opponents_many(
+    tm: "TensorModels",
+    players: np.ndarray,
+    next_idx: np.ndarray,
+    last: np.ndarray,
+    previous: np.ndarray,
+    eliminated: np.ndarray,
+) -> np.ndarray:
+    """forbidden_opponents for arrays of contexts; returns uint8 bitmasks."""
+    players, last, previous = (np.asarray(a, dtype=np.intp) for a in (players, last, previous))
+    eliminated = np.asarray(eliminated, dtype=np.uint8)
+    next_idx = np.asarray(next_idx, dtype=np.intp)
+    has_next = (next_idx >= 0) & (next_idx < len(ROUND_LIST))
+    assumed = np.where(has_next, tm.lobby_size.astype(np.intp)[np.where(has_next, next_idx, 0)], NUM_PLAYERS)
+    size = NUM_PLAYERS - np.unpackbits(eliminated[:, None], axis=1).sum(axis=1, dtype=np.intp)
+    size = np.minimum(size, assumed)
+    window = tm.rematch_window[size]
+
+    bit = np.array([0] + [1 << i for i in range(NUM_PLAYERS)])  # slot ID → mask bit
+    forbidden = np.where(window >= 1, bit[last], 0) | np.where(window >= 2, bit[previous], 0)
+    candidates = ((1 << NUM_PLAYERS) - 1) & ~eliminated.astype(np.int64) & ~bit[players]
+    return np.where(candidates & ~forbidden, forbidden, 0).astype(np.uint8)
+
+
+# ═══════════════════════════════════════════════════════════════════════════
+#  TENSOR MODELS
+# ═══════════════════════════════════════════════════════════════════════════
+
+class TensorModels(NamedTuple):
+    """Dense count arrays indexed by integer player IDs (0 = no opponent).
+
+    transition: [player, last, next]
+    position:   [player, round_absolute_idx, opponent]
+    bigram:     [player, prev, last, next]
+    matching:   [stage, matching, next_matching] (see count_matchings)
+    rematch:    [lobby_size, rematch] (see count_rematches)
+    cycle:      [gap, repeat] (see count_cycle_repeats)
+    alive:      [round_absolute_idx, player] → likely alive (bool)
+    lobby_size: [round_absolute_idx] → fewest players seen alive (0 = unknown)
+
+    context_scores and position_scores are the strategy-weighted views used
+    at prediction time (bigram×5 + transition×4, and position×3), and
+    rematch_window the rules compiled from rematch (see
+    compile_rematch_windows).
+    """
+    transition: np.ndarray
+    position: np.ndarray
+    bigram: np.ndarray
+    matching: np.ndarray
+    rematch: np.ndarray
+    cycle: np.ndarray
+    alive: np.ndarray
+    context_scores: np.ndarray
+    position_scores: np.ndarray
+    rematch_window: np.ndarray
+    lobby_size: np.ndarray
+
+
+def build_tensor_models(
+    transition: np.ndarray,
+    position: np.ndarray,
+    bigram: np.ndarray,
+    matching: np.ndarray,
+    rematch: np.ndarray,
+    cycle: np.ndarray,
+    round_alive_estimates: Dict[int, set],
+    lobby_size: np.ndarray,
+) -> TensorModels:
+    """Bundle the count tensors with the alive mask and weighted views.
+
+    *lobby_size* holds the lobby size assumed per round when a query names
+    no eliminations (see smallest_lobby_sizes).
+    """
+    alive = np.zeros((len(ROUND_LIST), NUM_SLOTS), dtype=bool)
+    for idx, players in round_alive_estimates.items():
+        if 0 <= idx < len(ROUND_LIST):
+            for name in players:
+                alive[idx, PLAYER_IDS.get(name, 0)] = True
+    alive[:, 0] = False
+
+    context_scores = 5 * bigram + 4 * transition[:, None, :, :]
+    position_scores = 3 * position
+
+    return TensorModels(
+        transition, position, bigram, matching, rematch, cycle, alive,
+        context_scores, position_scores, compile_rematch_windows(rematch), lobby_size,
+    )
+
+
+# ═══════════════════════════════════════════════════════════════════════════
+#  PREDICTION TABLE
+# ═══════════════════════════════════════════════════════════════════════════
+
+class PredictionTable(NamedTuple):
+    """Pre-scored answers for every no-elimination context.
+
+    Both arrays are indexed [player, round_idx, last, prev] (integer IDs,
+    0 = none): *scores* holds the final five-strategy score of each opponent
+    slot and *order* the opponent IDs ranked best-first, so a lookup only
+    has to format the response.
+    """
+    scores: np.ndarray  # [..., opponent] int64
+    order: np.ndarray   # [..., rank] uint8, IDs 1..NUM_PLAYERS
+
+    @property
+    def entries(self) -> int:
+        """Number of tabled contexts (player slot 0 is unused)."""
+        return int(np.prod(self.order[1:].shape[:-1]))
+
+
+def build_prediction_table(tm: TensorModels) -> PredictionTable:
+    """Score every (player, round, last, previous) context at once.
+
+    The query space is small and finite, so the five strategies are applied
+    to the whole space with array operations, mirroring
+    predict_next_opponent_tensor with no eliminations. Ties rank by lower
+    player ID, as in the live path.
+    """
+    num_rounds = len(ROUND_LIST)
+    not_self = ~np.eye(NUM_SLOTS, dtype=bool)
+    not_self[:, 0] = False
+
+    # Opponents the matchmaking rules rule out → forbidden[player, round, last, prev, opponent]
+    player, rnd, last, prev = (
+        a.ravel() for a in np.indices((NUM_SLOTS, num_rounds, NUM_SLOTS, NUM_SLOTS))
+    )
+    masks = forbidden_opponents_many(tm, player, rnd + 1, last, prev, np.zeros(len(player), dtype=np.uint8))
+    forbidden = np.zeros((len(player), NUM_SLOTS), dtype=bool)
+    forbidden[:, 1:] = np.unpackbits(masks[:, None], axis=1, bitorder="little")
+    forbidden = forbidden.reshape(NUM_SLOTS, num_rounds, NUM_SLOTS, NUM_SLOTS, NUM_SLOTS)
+    candidate = not_self[:, None, None, None, :] & ~forbidden
+
+    # Position / alive rows for the *next* round; nothing past the last round
+    next_position = np.zeros((NUM_SLOTS, num_rounds, NUM_SLOTS), dtype=np.int64)
+    next_position[:, :-1] = tm.position_scores[:, 1:]
+    next_alive = np.zeros((num_rounds, NUM_SLOTS), dtype=bool)
+    next_alive[:-1] = tm.alive[1:]
+
+    # ── Strategies 1–3 → scores[player, round, last, prev, opponent] ──
+    context = tm.context_scores.transpose(0, 2, 1, 3)  # [player, last, prev, opponent]
+    scores = context[:, None] + next_position[:, :, None, None, :]
+    scores[..., 0] = 0
+    scores[forbidden] = 0
+
+    # ── Strategy 4: Alive-but-unseen boost ──
+    boost = (scores == 0) & next_alive[None, :, None, None, :] & candidate
+    scores[boost] = 1
+
+    # ── Strategy 5: General frequency fallback ──
+    empty = ~scores.any(axis=-1)
+    scores[empty] = candidate[empty]
+
+    order = np.argsort(-scores[..., 1:], axis=-1, kind="stable").astype(np.uint8) + 1
+    return PredictionTable(scores, order)
+
+
+# ═══════════════════════════════════════════════════════════════════════════
+#  MODEL SNAPSHOT
+# ═══════════════════════════════════════════════════════════════════════════
+
+class ModelSnapshot(NamedTuple):
+    """Everything a request reads, published as one immutable object.
+
+    Rebuilds and ingestion never modify a live snapshot: they build a new one
+    and swap the module-level `model_snapshot` reference in one assignment.
+    A request that reads the reference once therefore sees a single
+    consistent model for its whole lifetime, without taking a lock.
+    """
+    version: str
+    tensors: TensorModels
+    table: PredictionTable
+    transition_model: Dict[Tuple[str, str], Counter]
+    position_model: Dict[Tuple[str, int], Counter]
+    bigram_model: Dict[Tuple[str, str, str], Counter]
+    round_alive_estimates: Dict[int, set]
+    player_survival: np.ndarray
+    alive_counts: np.ndarray
+    manifest: Dict[str, dict]
+
+    @property
+    def match_count(self) -> int:
+        return len(self.player_survival)
+
+
+def model_version(manifest: Dict[str, dict]) -> str:
+    """Identify a model by the content of the match files it was built from.
+
+    ARTIFACT_FORMAT is hashed in too, so a format change with unchanged
+    files gets a new version directory instead of reusing the old one.
+    """
+    digest = hashlib.sha256()
+    digest.update(f"format {ARTIFACT_FORMAT}\n".encode())
+    for name, fp in sorted(manifest.items()):
+        digest.update(f"{name}\0{fp['sha256']}\n".encode())
+    return digest.hexdigest()[:16]
+
+
+def make_snapshot(
+    tm: TensorModels,
+    table: PredictionTable,
+    survival: np.ndarray,
+    alive: np.ndarray,
+    manifest: Dict[str, dict],
+) -> ModelSnapshot:
+    """Bundle prebuilt arrays with the small per-process structures derived from them."""
+    transition_model, position_model, bigram_model = build_dict_models(tm.transition, tm.position, tm.bigram)
+    return ModelSnapshot(
+        version=model_version(manifest),
+        tensors=tm,
+        table=table,
+        transition_model=transition_model,
+        position_model=position_model,
+        bigram_model=bigram_model,
+        round_alive_estimates=compute_round_alive_estimates(alive, len(survival)),
+        player_survival=survival,
+        alive_counts=alive,
+        manifest=manifest,
+    )
+
+
 # ═══════════════════════════════════════════════════════════════════════════
 #  MODEL PERSISTENCE
 # ═══════════════════════════════════════════════════════════════════════════
 
-def save_models(path: str = MODEL_CACHE_FILE) -> None:
-    """Pickle the models to disk for fast reload."""
-    data = {
-        "transition_model": dict(transition_model),
-        "position_model": dict(position_model),
-        "bigram_model": dict(bigram_model),
-        "player_survival": player_survival,
-        "round_alive_estimates": round_alive_estimates,
+# Arrays written to the model artifact, one .npy file each
+ARTIFACT_ARRAYS = (
+    "transition", "position", "bigram", "matching", "rematch", "cycle", "alive",
+    "context_scores", "position_scores", "rematch_window", "lobby_size",
+    "table_scores", "table_order", "player_survival", "alive_counts",
+)
+
+
+def save_models(models: ModelSnapshot, path: str = MODEL_ARTIFACT_DIR) -> None:
+    """Write a model snapshot as <path>/<version>/ and point the marker at it.
+
+    Every array a worker needs to serve is included, so loading is just
+    memory-mapping files. The version directory is assembled beside its
+    final name and renamed into place, and the marker file is replaced
+    last, so readers never see a half-written artifact. Other workers
+    notice the marker change and reload (see check_for_new_model).
+
+    Versions are content-addressed (see model_version): when another
+    worker has already published the same version, its directory is kept
+    and only the marker is updated, after refreshing its header's manifest
+    if file mtimes moved. A directory with an unreadable header or another
+    format is replaced.
+    """
+    arrays = dict(models.tensors._asdict())
+    arrays.update(
+        table_scores=models.table.scores,
+        table_order=models.table.order,
+        player_survival=models.player_survival,
+        alive_counts=models.alive_counts,
+    )
+    header = {
+        "format": ARTIFACT_FORMAT,
+        "version": models.version,
         "saved_at": datetime.now().isoformat(),
+        "match_count": models.match_count,
+        "manifest": models.manifest,
+        "arrays": list(ARTIFACT_ARRAYS),
     }
-    with open(path, "wb") as f:
-        pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
-    log.info("Models cached to %s", path)
+
+    root = Path(path)
+    target = root / models.version
+    existing = _read_artifact_header(target)
+    if existing is None or existing.get("format") != ARTIFACT_FORMAT:
+        shutil.rmtree(target, ignore_errors=True)
+        existing = None
+    if existing is not None and existing.get("manifest") != models.manifest:
+        header_tmp = target / f".header.json.tmp-{os.getpid()}-{uuid.uuid4().hex}"
+        header_tmp.write_text(json.dumps(header))
+        os.replace(header_tmp, target / "header.json")
+    if existing is None:
+        staging = root / f".{models.version}.tmp-{os.getpid()}-{uuid.uuid4().hex}"
+        staging.mkdir(parents=True)
+        try:
+            for name in ARTIFACT_ARRAYS:
+                np.save(staging / f"{name}.npy", np.ascontiguousarray(arrays[name]))
+            (staging / "header.json").write_text(json.dumps(header))
+            os.replace(staging, target)
+        except OSError:
+            # Lost the race to a worker publishing the same version
+            if not target.exists():
+                raise
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+
+    marker = root / f".{MODEL_VERSION_MARKER}.tmp-{os.getpid()}-{uuid.uuid4().hex}"
+    marker.write_text(models.version)
+    os.replace(marker, root / MODEL_VERSION_MARKER)
+    prune_model_versions(root, keep=models.version)
+    log.info("Models saved to %s/", target)
+
+
+def _read_artifact_header(version_dir: Path) -> Optional[dict]:
+    """The header.json of a version directory, or None if missing or unreadable."""
+    try:
+        return json.loads((version_dir / "header.json").read_text())
+    except (OSError, ValueError):
+        return None
 
 
-def load_models(path: str = MODEL_CACHE_FILE) -> Optional[dict]:
-    """Load cached models if available and not stale."""
-    if not os.path.exists(path):
+def prune_model_versions(root: Path, keep: str) -> None:
+    """Delete all but the newest MODEL_VERSIONS_KEPT version directories.
+
+    A few old versions are kept so a worker still mapping one is not
+    surprised; mapped files stay readable after deletion anyway.
+    """
+    versions = sorted(
+        (d for d in root.iterdir() if d.is_dir() and not d.name.startswith(".") and d.name != keep),
+        key=lambda d: d.stat().st_mtime,
+        reverse=True,
+    )
+    for old in versions[MODEL_VERSIONS_KEPT - 1:]:
+        shutil.rmtree(old, ignore_errors=True)
+
+
+@contextmanager
+def model_writer(path: str = MODEL_ARTIFACT_DIR):
+    """Hold the model write lock across threads and worker processes.
+
+    model_lock alone only covers this process; the flock on
+    <path>/MODEL_WRITE_LOCK makes a writer in one worker wait for a writer
+    in another, so each builds on the model the last one published.
+    """
+    with model_lock:
+        root = Path(path)
+        root.mkdir(parents=True, exist_ok=True)
+        with open(root / MODEL_WRITE_LOCK, "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def load_models(path: str = MODEL_ARTIFACT_DIR) -> Optional[dict]:
+    """Memory-map the model artifact the version marker points at.
+
+    Arrays are opened read-only with mmap, so every worker process maps the
+    same physical pages instead of holding a private copy. Staleness is
+    decided by the caller, by comparing the header's "manifest" against the
+    match files currently on disk (see initialize).
+
+    Returns {"header": dict, "arrays": {name: ndarray}} or None.
+    """
+    marker = Path(path) / MODEL_VERSION_MARKER
+    if not marker.exists():
         return None
     try:
-        with open(path, "rb") as f:
-            data = pickle.load(f)
-        # Basic validation
-        for key in ("transition_model", "position_model", "bigram_model"):
-            if key not in data:
-                log.warning("Cached model missing key '%s', rebuilding.", key)
-                return None
-        log.info("Models loaded from cache (%s)", data.get("saved_at", "unknown"))
-        return data
+        version_dir = Path(path) / marker.read_text().strip()
+        header = json.loads((version_dir / "header.json").read_text())
+        if header.get("format") != ARTIFACT_FORMAT:
+            log.warning("Model artifact format %s is not %s, rebuilding.", header.get("format"), ARTIFACT_FORMAT)
+            return None
+        arrays = {
+            name: np.load(version_dir / f"{name}.npy", mmap_mode="r").view(np.ndarray)
+            for name in ARTIFACT_ARRAYS
+        }
+        log.info("Models mapped from %s/ (%s)", version_dir, header.get("saved_at", "unknown"))
+        return {"header": header, "arrays": arrays}
     except Exception:
-        log.exception("Failed to load cached models, rebuilding.")
+        log.exception("Failed to load model artifact, rebuilding.")
         return None
 
 
+def artifact_counts(cached: dict) -> Tuple[np.ndarray, ...]:
+    """The count tensors and survival rows of a loaded artifact, as apply_manifest_delta takes them."""
+    arrays = cached["arrays"]
+    return (
+        arrays["transition"], arrays["position"], arrays["bigram"], arrays["matching"],
+        arrays["rematch"], arrays["cycle"], arrays["player_survival"],
+    )
+
+
+def snapshot_from_artifact(cached: dict, manifest: Optional[Dict[str, dict]] = None) -> ModelSnapshot:
+    """Build a snapshot around the mapped arrays of a loaded artifact."""
+    arrays = cached["arrays"]
+    return make_snapshot(
+        TensorModels(**{field: arrays[field] for field in TensorModels._fields}),
+        PredictionTable(arrays["table_scores"], arrays["table_order"]),
+        arrays["player_survival"],
+        arrays["alive_counts"],
+        cached["header"]["manifest"] if manifest is None else manifest,
+    )
+
+
 # ═══════════════════════════════════════════════════════════════════════════
 #  PREDICTION ENGINE
 # ═══════════════════════════════════════════════════════════════════════════
@@ -311,6 +1290,7 @@ def predict_next_opponent(
     last_opponent: str,
     previous_opponent: Optional[str] = None,
     eliminated: Optional[set] = None,
+    models: Optional[ModelSnapshot] = None,
 ) -> List[dict]:
     """Predict the next opponent with confidence scores.
 
@@ -324,30 +1304,78 @@ def predict_next_opponent(
           baseline score so they aren't excluded just because of sparse data)
       5. General frequency fallback             — weight 1 (empty state)
 
+    Before scoring, recent opponents the matchmaking rules rule out (see
+    forbidden_opponents) are excluded like eliminated players.
+
+    Scoring is delegated to the backend selected by MODEL_BACKEND; both
+    backends return identical results for identical model counts. With
+    ELIMINATION_MODEL "matching", queries with eliminations are answered
+    by predict_next_opponent_matching instead.
+
     Args:
         eliminated: set of player names known to be dead (excluded entirely).
+        models:     snapshot to score against (default: the live one).
 
     Returns a list of up to 3 named opponents plus an "Other Players" entry
     that *also* lists the remaining alive candidates so the user knows who
     else is in the pool.
     """
+    if ELIMINATION_MODEL == "matching" and eliminated_mask(eliminated):
+        preds = predict_next_opponent_matching(
+            player, current_round_idx, last_opponent, previous_opponent, eliminated, models,
+        )
+        if preds is not None:
+            return preds
+    if MODEL_BACKEND == "dict":
+        return predict_next_opponent_dict(
+            player, current_round_idx, last_opponent, previous_opponent, eliminated, models,
+        )
+    return predict_next_opponent_tensor(
+        player, current_round_idx, last_opponent, previous_opponent, eliminated, models,
+    )
+
+
+def predict_next_opponent_dict(
+    player: str,
+    current_round_idx: int,
+    last_opponent: str,
+    previous_opponent: Optional[str] = None,
+    eliminated: Optional[set] = None,
+    models: Optional[ModelSnapshot] = None,
+) -> List[dict]:
+    """Score candidates from the dict-of-Counter models."""
+    models = models or model_snapshot
+    transition_model, position_model, bigram_model = (
+        models.transition_model, models.position_model, models.bigram_model,
+    )
     eliminated = eliminated or set()
     scores: Counter = Counter()
-    alive_estimate: Optional[set] = round_alive_estimates.get(current_round_idx + 1)
+    alive_estimate: Optional[set] = models.round_alive_estimates.get(current_round_idx + 1)
+
+    # Eliminated players and recent opponents the matchmaking rules rule out
+    forbidden = forbidden_opponents(
+        models.tensors,
+        PLAYER_IDS.get(player, 0),
+        current_round_idx + 1,
+        PLAYER_IDS.get(last_opponent, 0),
+        PLAYER_IDS.get(previous_opponent, 0),
+        eliminated_mask(eliminated),
+    )
+    excluded = eliminated | {ALL_PLAYERS[i] for i in range(NUM_PLAYERS) if forbidden >> i & 1}
 
     # ── Strategy 1: Bigram (2-step Markov) ──
     if previous_opponent:
         bigram_key = (player, previous_opponent, last_opponent)
         if bigram_key in bigram_model:
             for opp, count in bigram_model[bigram_key].items():
-                if opp not in eliminated:
+                if opp not in excluded:
                     scores[opp] += count * 5
 
     # ── Strategy 2: Single-step transition ──
     trans_key = (player, last_opponent)
     if trans_key in transition_model:
         for opp, count in transition_model[trans_key].items():
-            if opp not in eliminated:
+            if opp not in excluded:
                 scores[opp] += count * 4
 
     # ── Strategy 3: Positional ──
@@ -355,46 +1383,111 @@ def predict_next_opponent(
     pos_key = (player, next_idx)
     if pos_key in position_model:
         for opp, count in position_model[pos_key].items():
-            if opp != player and opp not in eliminated:
+            if opp != player and opp not in excluded:
                 scores[opp] += count * 3
 
     # ── Strategy 4: Alive-but-unseen boost ──
     # Magic Chess Go Go's matchmaking tends to avoid re-pairing you with
-    # recent opponents. Players who are probably alive but never appeared
-    # in this context get a small baseline score so they stay in the pool.
+    # recent opponents (the rules behind *excluded* enforce what the corpus
+    # shows). Players who are probably alive but never appeared in this
+    # context get a small baseline score so they stay in the pool.
     if alive_estimate:
         for p in alive_estimate:
-            if p != player and p not in eliminated and p not in scores:
+            if p != player and p not in excluded and p not in scores:
                 scores[p] += 1  # Small weight — "don't forget me"
 
     # ── Strategy 5: General frequency fallback ──
     if not scores:
         for p in ALL_PLAYERS:
-            if p != player and p not in eliminated:
+            if p != player and p not in excluded:
                 scores[p] = 1
 
-    # ── Build response ──
-    total = sum(scores.values())
-    top_n = scores.most_common(3)
+    # Ties rank by lower player ID, as in the tensor backend
+    ranked = sorted(scores.items(), key=lambda item: (-item[1], PLAYER_IDS[item[0]]))
+    return format_predictions(player, ranked, alive_estimate)
+
+
+def predict_next_opponent_tensor(
+    player: str,
+    current_round_idx: int,
+    last_opponent: str,
+    previous_opponent: Optional[str] = None,
+    eliminated: Optional[set] = None,
+    models: Optional[ModelSnapshot] = None,
+) -> List[dict]:
+    """Score candidates from the dense tensor models.
+
+    Same five strategies as the dict backend: strategies 1–3 are two slices
+    of the pre-weighted tensors and one sum; the rest runs on a 9-slot list.
+    """
+    tm = (models or model_snapshot).tensors
+    pid = PLAYER_IDS.get(player, 0)
+    last = PLAYER_IDS.get(last_opponent, 0)
+    prev = PLAYER_IDS.get(previous_opponent, 0) if previous_opponent else 0
+    next_idx = current_round_idx + 1
+
+    # ── Strategies 1–3: bigram×5 + transition×4 (pre-summed) + position×3 ──
+    row = tm.context_scores[pid, prev, last]
+    if 0 <= next_idx < len(ROUND_LIST):
+        row = row + tm.position_scores[pid, next_idx]
+    scores = row.tolist()
+
+    # Slot 0 ("no opponent") is never a candidate
+    blocked = [False] * NUM_SLOTS
+    blocked[0] = True
+    for name in eliminated or ():
+        blocked[PLAYER_IDS.get(name, 0)] = True
+    forbidden = forbidden_opponents(tm, pid, next_idx, last, prev, eliminated_mask(eliminated))
+    for i in range(1, NUM_SLOTS):
+        if forbidden >> (i - 1) & 1:
+            blocked[i] = True
+    for i in range(NUM_SLOTS):
+        if blocked[i]:
+            scores[i] = 0
+
+    # ── Strategy 4: Alive-but-unseen boost ──
+    alive_estimate: Optional[set] = None
+    if 0 <= next_idx < len(ROUND_LIST):
+        alive = tm.alive[next_idx].tolist()
+        if any(alive):
+            alive_estimate = set()
+            for i in range(1, NUM_SLOTS):
+                if alive[i]:
+                    alive_estimate.add(ALL_PLAYERS[i - 1])
+                    if i != pid and not blocked[i] and scores[i] == 0:
+                        scores[i] = 1
+
+    # ── Strategy 5: General frequency fallback ──
+    if not any(scores):
+        scores = [0 if blocked[i] or i == pid else 1 for i in range(NUM_SLOTS)]
+
+    order = sorted(range(1, NUM_SLOTS), key=lambda i: -scores[i])
+    ranked = [(ALL_PLAYERS[i - 1], scores[i]) for i in order if scores[i] > 0]
+    return format_predictions(player, ranked, alive_estimate)
+
+
+def format_predictions(
+    player: str,
+    ranked: List[Tuple[str, int]],
+    alive_estimate: Optional[set],
+) -> List[dict]:
+    """Build the top-3 + "Other Players" response from scores sorted high → low."""
+    total = sum(count for _, count in ranked)
 
     predictions = []
     top_sum = 0.0
-    top_set: set = set()
-    for opp, count in top_n:
+    for opp, count in ranked[:3]:
         prob = round((count / total) * 100, 1)
         predictions.append({"opponent": opp, "probability": prob})
         top_sum += prob
-        top_set.add(opp)
 
     # ── Other candidates (named, not just a lump) ──
     other_candidates: List[dict] = []
     if alive_estimate:
-        for p in sorted(alive_estimate, key=lambda x: scores.get(x, 0), reverse=True):
-            if p != player and p not in top_set:
-                weight = scores.get(p, 0)
-                if weight > 0:
-                    share = round((weight / total) * 100, 1)
-                    other_candidates.append({"opponent": p, "probability": share})
+        for p, weight in ranked[3:]:
+            if p != player and p in alive_estimate:
+                share = round((weight / total) * 100, 1)
+                other_candidates.append({"opponent": p, "probability": share})
 
     other_prob = round(100.0 - top_sum, 1)
     if other_prob > 0.0:
@@ -406,19 +1499,161 @@ def predict_next_opponent(
     return predictions
 
 
+def lookup_prediction(
+    player: str,
+    current_round_idx: int,
+    last_opponent: str,
+    previous_opponent: Optional[str] = None,
+    models: Optional[ModelSnapshot] = None,
+) -> Optional[List[dict]]:
+    """Return the precomputed predictions for a context, or None if not tabled.
+
+    Only contexts whose opponents are known player names are served from the
+    table; anything else (and any request with eliminations) is scored live.
+    """
+    pid = PLAYER_IDS.get(player)
+    last_id = PLAYER_IDS.get(last_opponent)
+    prev_id = PLAYER_IDS.get(previous_opponent) if previous_opponent else 0
+    if pid is None or last_id is None or prev_id is None:
+        return None
+    if not 0 <= current_round_idx < len(ROUND_LIST):
+        return None
+    models = models or model_snapshot
+    key = (pid, current_round_idx, last_id, prev_id)
+    scores = models.table.scores[key].tolist()
+    ranked = [(ALL_PLAYERS[i - 1], scores[i]) for i in models.table.order[key].tolist() if scores[i] > 0]
+    return format_predictions(player, ranked, models.round_alive_estimates.get(current_round_idx + 1))
+
+
+def eliminated_mask(names) -> int:
+    """Encode eliminated player names as a bitmask (bit i-1 = "Player i")."""
+    mask = 0
+    for name in names or ():
+        pid = PLAYER_IDS.get(name)
+        if pid:
+            mask |= 1 << (pid - 1)
+    return mask
+
+
+def predict_next_opponent_many(
+    players: np.ndarray,
+    round_idx: np.ndarray,
+    last: np.ndarray,
+    previous: np.ndarray,
+    eliminated: Optional[np.ndarray] = None,
+    models: Optional[ModelSnapshot] = None,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Score N contexts at once with array operations.
+
+    Inputs are length-N integer arrays: player, last and previous opponent
+    IDs (0 = none/unknown), current round indices, and optionally uint8
+    eliminated masks (see eliminated_mask). The five strategies are those
+    of predict_next_opponent_tensor, applied to all rows together.
+
+    Returns (scores [N, NUM_SLOTS] int64, order [N, NUM_PLAYERS] uint8):
+    final scores per opponent slot, and opponent IDs ranked best-first
+    (ties by lower ID). format_many turns them into response dicts.
+    """
+    tm = (models or model_snapshot).tensors
+    players = np.asarray(players, dtype=np.intp)
+    last = np.asarray(last, dtype=np.intp)
+    previous = np.asarray(previous, dtype=np.intp)
+    next_idx = np.asarray(round_idx, dtype=np.intp) + 1
+    masks = np.zeros(len(players), dtype=np.uint8) if eliminated is None else np.asarray(eliminated, dtype=np.uint8)
+    masks = masks | forbidden_opponents_many(tm, players, next_idx, last, previous, masks)
+    has_next = (next_idx >= 0) & (next_idx < len(ROUND_LIST))
+    next_idx = np.where(has_next, next_idx, 0)
+
+    # ── Strategies 1–3: bigram×5 + transition×4 (pre-summed) + position×3 ──
+    scores = tm.context_scores[players, previous, last]
+    scores += tm.position_scores[players, next_idx] * has_next[:, None]
+
+    # Eliminated players and opponents the matchmaking rules rule out
+    blocked = np.zeros(scores.shape, dtype=bool)
+    blocked[:, 0] = True
+    blocked[:, 1:] = np.unpackbits(masks[:, None], axis=1, bitorder="little").astype(bool)
+    scores[blocked] = 0
+    candidate = ~blocked
+    candidate[np.arange(len(players)), players] = False
+
+    # ── Strategy 4: Alive-but-unseen boost ──
+    alive = tm.alive[next_idx] & has_next[:, None]
+    scores[(scores == 0) & alive & candidate] = 1
+
+    # ── Strategy 5: General frequency fallback ──
+    empty = ~scores.any(axis=1)
+    scores[empty] = candidate[empty]
+
+    order = np.argsort(-scores[:, 1:], axis=1, kind="stable").astype(np.uint8) + 1
+    return scores, order
+
+
+def format_many(
+    players: np.ndarray,
+    round_idx: np.ndarray,
+    scores: np.ndarray,
+    order: np.ndarray,
+    models: Optional[ModelSnapshot] = None,
+) -> List[List[dict]]:
+    """Format predict_next_opponent_many output as per-query prediction lists.
+
+    Formatting is the per-query Python cost, so each distinct (player,
+    round, scores) row is formatted once; queries with identical rows
+    share the same result list.
+    """
+    estimates = (models or model_snapshot).round_alive_estimates
+    players = np.asarray(players, dtype=np.int64)
+    round_idx = np.asarray(round_idx, dtype=np.int64)
+    if not len(players):
+        return []
+    keys = np.column_stack([players, round_idx, scores])
+    unique, first, inverse = np.unique(keys, axis=0, return_index=True, return_inverse=True)
+
+    formatted = []
+    for row, ranks in zip(unique.tolist(), order[first].tolist()):
+        pid, idx, row = row[0], row[1], row[2:]
+        player = ALL_PLAYERS[pid - 1] if pid else ""
+        ranked = [(ALL_PLAYERS[i - 1], row[i]) for i in ranks if row[i] > 0]
+        formatted.append(format_predictions(player, ranked, estimates.get(idx + 1)))
+    return [formatted[i] for i in inverse.ravel().tolist()]
+
+
+def predict_queries(queries: List[tuple], models: Optional[ModelSnapshot] = None) -> List[List[dict]]:
+    """Score parsed (player, current_round, last, previous, eliminated) queries together."""
+    models = models or model_snapshot
+    n = len(queries)
+    players = np.fromiter((PLAYER_IDS.get(q[0], 0) for q in queries), np.intp, n)
+    round_idx = np.fromiter((round_to_absolute_index(q[1]) for q in queries), np.intp, n)
+    last = np.fromiter((PLAYER_IDS.get(q[2], 0) for q in queries), np.intp, n)
+    previous = np.fromiter((PLAYER_IDS.get(q[3], 0) for q in queries), np.intp, n)
+    eliminated = np.fromiter((eliminated_mask(q[4]) for q in queries), np.uint8, n)
+    scores, order = predict_next_opponent_many(players, round_idx, last, previous, eliminated, models)
+    preds = format_many(players, round_idx, scores, order, models)
+    if ELIMINATION_MODEL == "matching":
+        for i in np.flatnonzero(eliminated).tolist():
+            player, _, last_opponent, previous_opponent, names = queries[i]
+            preds[i] = predict_next_opponent_matching(
+                player, int(round_idx[i]), last_opponent, previous_opponent, names, models,
+            ) or preds[i]
+    return preds
+
+
 def predict_chain(
     player: str,
     history: List[dict],
+    models: Optional[ModelSnapshot] = None,
 ) -> List[dict]:
     """Predict a chain of opponents given a match history.
 
     Args:
         player:  e.g. "Player 3"
         history: list of {"round": "III-2", "opponent": "Player 5"} dicts
+        models:  snapshot to score against (default: the live one)
 
     Returns:
         list of results with predictions for each step
     """
+    models = models or model_snapshot
     results = []
     for i, item in enumerate(history):
         round_str = item.get("round", "I-1")
@@ -429,9 +1664,11 @@ def predict_chain(
             continue
 
         round_idx = round_to_absolute_index(round_str)
-        preds = predict_next_opponent(
-            player, round_idx, opponent, previous_opponent=prev_opp,
-        )
+        preds = lookup_prediction(player, round_idx, opponent, prev_opp, models)
+        if preds is None:
+            preds = predict_next_opponent(
+                player, round_idx, opponent, previous_opponent=prev_opp, models=models,
+            )
         results.append({
             "round": round_str,
             "opponent": opponent,
@@ -441,44 +1678,1253 @@ def predict_chain(
 
 
 # ═══════════════════════════════════════════════════════════════════════════
-#  API ROUTES
+#  LOBBY PREDICTION
 # ═══════════════════════════════════════════════════════════════════════════
 
-@app.route("/api/health", methods=["GET"])
-def health():
-    return jsonify({
-        "status": "ok",
-        "matches_loaded": match_count,
-        "models_cached": os.path.exists(MODEL_CACHE_FILE),
-        "timestamp": datetime.now().isoformat(),
-    })
+@lru_cache(maxsize=512)
+def _matching_dp_plan(nodes: Tuple[int, ...]):
+    """Index arrays for summing over the pairings of every subset of *nodes*.
 
+    Subsets are bitmasks over positions in *nodes*. The total weight Z of
+    a subset's pairings pairs its lowest node with each other node j:
+    Z(mask) = Σ_j w[low, j] · Z(mask without low and j). Masks are grouped
+    by size, so each level is one gather and one bincount.
 
-@app.route("/api/players", methods=["GET"])
-def get_players():
-    return jsonify({"players": ALL_PLAYERS})
+    Returns (levels, pairs): per even size, (mask, a, b, rest) arrays with
+    a/b as slot IDs; and for every pair of nodes, (a, b, full mask without
+    a and b).
+    """
+    n = len(nodes)
+    levels = []
+    for size in range(2, n + 1, 2):
+        terms = []
+        for mask in range(1 << n):
+            if bin(mask).count("1") != size:
+                continue
+            low = (mask & -mask).bit_length() - 1
+            for j in range(low + 1, n):
+                if mask >> j & 1:
+                    terms.append((mask, nodes[low], nodes[j], mask ^ (1 << low) ^ (1 << j)))
+        levels.append(tuple(np.array(column, dtype=np.intp) for column in zip(*terms)))
+    i, j = np.triu_indices(n, k=1)
+    ids = np.array(nodes, dtype=np.intp)
+    return levels, (ids[i], ids[j], ((1 << n) - 1) ^ (1 << i) ^ (1 << j))
+
+
+def matching_marginals(weights: np.ndarray, nodes: Tuple[int, ...]) -> np.ndarray:
+    """P(a paired with b) when a whole-lobby pairing M has probability ∝ ∏ weights[a, b].
+
+    *weights* is a symmetric [NUM_SLOTS, NUM_SLOTS] affinity matrix and
+    *nodes* an even number of slot IDs. The sum over pairings is exact,
+    by bitmask dynamic programming (see _matching_dp_plan), so
+    P(a, b) = weights[a, b] · Z(nodes without a, b) / Z(nodes). If no
+    pairing has positive weight, all pairings are taken as equally likely.
+    """
+    levels, (a, b, rest) = _matching_dp_plan(nodes)
+    size = 1 << len(nodes)
 
+    def partition(w: np.ndarray) -> np.ndarray:
+        z = np.zeros(size)
+        z[0] = 1.0
+        for masks, i, j, sub in levels:
+            z += np.bincount(masks, weights=w[i, j] * z[sub], minlength=size)
+        return z
 
-@app.route("/api/rounds", methods=["GET"])
-def get_rounds():
-    """Return the canonical round list for the frontend."""
-    return jsonify({"rounds": ROUND_LIST})
+    z = partition(weights)
+    if z[-1] <= 0:
+        weights = np.ones_like(weights)
+        z = partition(weights)
 
+    marginals = np.zeros((NUM_SLOTS, NUM_SLOTS))
+    marginals[a, b] = weights[a, b] * z[rest] / z[-1]
+    marginals[b, a] = marginals[a, b]
+    return marginals
 
-@app.route("/api/stats", methods=["GET"])
-def get_stats():
-    """Return model statistics for debugging / transparency."""
+
+def lobby_marginals(
+    ids: np.ndarray,
+    current_round_idx: int,
+    last: np.ndarray,
+    previous: np.ndarray,
+    eliminated: set,
+    models: Optional[ModelSnapshot] = None,
+) -> np.ndarray:
+    """Pairing-consistent P(i faces j) over the alive seats *ids*.
+
+    All seats are scored in one predict_next_opponent_many pass (*last* and
+    *previous* are their opponent IDs, 0 = unknown). Each seat's scores are
+    normalised to a distribution p_i, and seats i and j get the symmetric
+    affinity sqrt(p_i(j) · p_j(i)). The result is the exact pairing
+    marginals under a distribution over whole-lobby pairings. With an odd
+    number alive, slot 0 is the ghost (mirror) opponent, with each seat's
+    average affinity.
+
+    Returns a [NUM_SLOTS, NUM_SLOTS] matrix, symmetric, rows summing to one.
+    """
+    n = len(ids)
+    scores, _ = predict_next_opponent_many(
+        ids,
+        np.full(n, current_round_idx),
+        last,
+        previous,
+        np.full(n, eliminated_mask(eliminated), dtype=np.uint8),
+        models,
+    )
+    p = np.zeros((NUM_SLOTS, NUM_SLOTS))
+    p[ids] = scores / scores.sum(axis=1, keepdims=True)
+    weights = np.sqrt(p * p.T)
+
+    nodes = tuple(ids.tolist())
+    if n % 2:
+        ghost = weights[np.ix_(ids, ids)].sum(axis=1) / (n - 1)
+        weights[0, ids] = weights[ids, 0] = ghost
+        nodes = (0, *nodes)
+    return matching_marginals(weights, nodes)
+
+
+def rank_marginals(pid: int, ids: List[int], marginals: np.ndarray) -> List[Tuple[str, float]]:
+    """A seat's row of lobby_marginals, best first, with slot 0 as GHOST_OPPONENT."""
+    return sorted(
+        ((GHOST_OPPONENT if j == 0 else ALL_PLAYERS[j - 1], float(marginals[pid, j]))
+         for j in (0, *ids) if marginals[pid, j] > 0),
+        key=lambda item: -item[1],
+    )
+
+
+def predict_lobby(
+    current_round_idx: int,
+    last: Dict[str, str],
+    previous: Dict[str, str],
+    eliminated: set,
+    models: Optional[ModelSnapshot] = None,
+) -> Dict[str, dict]:
+    """Predict every alive player's next opponent so the answers agree with each other.
+
+    Probabilities are lobby_marginals, so P(i faces j) equals P(j faces i)
+    and each player's probabilities sum to one; the ghost is ranked
+    alongside real opponents as GHOST_OPPONENT.
+
+    Args:
+        last / previous: player → opponent in the last two rounds (if any).
+
+    Returns player → {"next_predictions": [...], "ghost_probability": float}.
+    """
+    alive = [p for p in ALL_PLAYERS if p not in eliminated]
+    if len(alive) < 2:
+        return {}
+    ids = np.array([PLAYER_IDS[p] for p in alive], dtype=np.intp)
+    marginals = lobby_marginals(
+        ids,
+        current_round_idx,
+        np.array([PLAYER_IDS.get(last.get(p), 0) for p in alive]),
+        np.array([PLAYER_IDS.get(previous.get(p), 0) for p in alive]),
+        eliminated,
+        models,
+    )
+
+    alive_set = set(alive)
+    lobby = {}
+    for pid, player in zip(ids.tolist(), alive):
+        lobby[player] = {
+            "next_predictions": format_predictions(player, rank_marginals(pid, ids.tolist(), marginals), alive_set),
+            "ghost_probability": round(float(marginals[pid, 0]) * 100, 1),
+        }
+    return lobby
+
+
+def predict_next_opponent_matching(
+    player: str,
+    current_round_idx: int,
+    last_opponent: str,
+    previous_opponent: Optional[str] = None,
+    eliminated: Optional[set] = None,
+    models: Optional[ModelSnapshot] = None,
+) -> Optional[List[dict]]:
+    """One player's prediction, reconciled with how the rest of the lobby must pair up.
+
+    The player is scored with its full context and every other alive seat
+    with round information only (their opponents are unknown). Their
+    lobby_marginals row is returned, so players that others are likely to
+    face lose probability, and an odd lobby ranks GHOST_OPPONENT. Returns
+    None when the player is eliminated or alone.
+    """
+    eliminated = eliminated or set()
+    alive = [p for p in ALL_PLAYERS if p not in eliminated]
+    pid = PLAYER_IDS.get(player, 0)
+    if player not in alive or len(alive) < 2:
+        return None
+    ids = np.array([PLAYER_IDS[p] for p in alive], dtype=np.intp)
+    is_player = ids == pid
+    marginals = lobby_marginals(
+        ids,
+        current_round_idx,
+        np.where(is_player, PLAYER_IDS.get(last_opponent, 0), 0),
+        np.where(is_player, PLAYER_IDS.get(previous_opponent, 0) if previous_opponent else 0, 0),
+        eliminated,
+        models,
+    )
+    return format_predictions(player, rank_marginals(pid, ids.tolist(), marginals), set(alive))
+
+
+def predict_next_matching(
+    current_round_idx: int,
+    matching_id: int,
+    models: Optional[ModelSnapshot] = None,
+) -> np.ndarray:
+    """P(next matching | current matching, stage) as a [NUM_MATCHINGS] distribution.
+
+    Backs off to every next matching seen in the stage when *matching_id*
+    was never followed there, and to uniform when the stage has no data.
+    """
+    models = models or model_snapshot
+    counts = models.tensors.matching[ROUND_STAGE[current_round_idx]]
+    row = counts[matching_id]
+    if not row.any():
+        row = counts.sum(axis=0)
+    if not row.any():
+        row = np.ones(NUM_MATCHINGS)
+    return row / row.sum()
+
+
+def predict_lobby_matching(
+    current_round_idx: int,
+    last: Dict[str, str],
+    models: Optional[ModelSnapshot] = None,
+) -> Optional[Tuple[Dict[str, dict], np.ndarray]]:
+    """Predict every player's next opponent from the matching-level model.
+
+    Applies only when *last* pairs up all eight players (None otherwise).
+    Per-seat probabilities are the next-matching distribution projected
+    through MATCHING_PROJECTION, so they agree across players by
+    construction.
+
+    Returns (player → {"next_predictions", "ghost_probability"}, the
+    next-matching distribution).
+    """
+    opponents = np.array([PLAYER_IDS.get(last.get(p), 0) for p in ALL_PLAYERS])
+    matching_id = int(matching_ids(opponents))
+    if matching_id < 0:
+        return None
+    dist = predict_next_matching(current_round_idx, matching_id, models)
+    marginals = np.tensordot(dist, MATCHING_PROJECTION, axes=1)
+
+    alive_set = set(ALL_PLAYERS)
+    lobby = {}
+    for pid, player in enumerate(ALL_PLAYERS, start=1):
+        ranked = sorted(
+            ((ALL_PLAYERS[j - 1], marginals[pid, j]) for j in range(1, NUM_SLOTS) if marginals[pid, j] > 0),
+            key=lambda item: -item[1],
+        )
+        lobby[player] = {
+            "next_predictions": format_predictions(player, ranked, alive_set),
+            "ghost_probability": 0.0,
+        }
+    return lobby, dist
+
+
+# ═══════════════════════════════════════════════════════════════════════════
+#  SCHEDULE TEMPLATES
+# ═══════════════════════════════════════════════════════════════════════════
+
+# A cycle period is used when, across the corpus, a seat's full-lobby
+# opponent repeats the one `period` fights earlier at least this often,
+# over at least SCHEDULE_MIN_SUPPORT fights
+SCHEDULE_MIN_CONFIDENCE = 0.9
+SCHEDULE_MIN_SUPPORT = 50
+
+
+class ScheduleTemplate(NamedTuple):
+    """The corpus' fight cycle: a seat's opponents repeat every *period* fights."""
+    period: int
+    confidence: float  # share of full-lobby fights repeating the one *period* earlier
+
+
+def schedule_template(tm: TensorModels) -> Optional[ScheduleTemplate]:
+    """The most reliable cycle period in tm.cycle, or None below the thresholds."""
+    support = tm.cycle.sum(axis=1)
+    rate = np.where(support >= SCHEDULE_MIN_SUPPORT, tm.cycle[:, 1] / np.maximum(support, 1), 0.0)
+    period = int(np.argmax(rate))
+    if rate[period] < SCHEDULE_MIN_CONFIDENCE:
+        return None
+    return ScheduleTemplate(period, float(rate[period]))
+
+
+def predict_schedule(
+    player: str,
+    current_round_idx: int,
+    fights: List[Tuple[int, str]],
+    eliminated: Optional[set] = None,
+    models: Optional[ModelSnapshot] = None,
+) -> Optional[dict]:
+    """Answer a full-lobby game's remaining schedule from its own fight cycle.
+
+    *fights* is the player's (round index, opponent) history, in order.
+    Games do not share schedules, but within a game the pairings follow a
+    cycle (see schedule_template). The first P opponents, for period P, are
+    the game's template and must be distinct opponents. They are also known
+    after P - 1 fights if exactly one other player is still unfaced. The
+    history matches when every later fight repeats the one P earlier. Each
+    round after *current_round_idx* that usually has fights with the whole
+    lobby alive is then answered in one lookup: fight t faces
+    template[t mod P]. Such rounds between the last fight and
+    *current_round_idx* count as fights too, played but not reported.
+
+    Returns None when anyone is eliminated, the corpus has no trusted
+    period, or the history does not match; callers then fall back to
+    predict_next_opponent. Otherwise returns {"template": {"period",
+    "confidence"}, "schedule": [{"round", "opponent", "confidence"}, ...],
+    "next_predictions": [...] for the first scheduled round}.
+    """
+    tm = (models or model_snapshot).tensors
+    template = schedule_template(tm)
+    if template is None or eliminated or not fights:
+        return None
+    period = template.period
+    opponents = [opp for _, opp in fights]
+    cycle = opponents[:period]
+    if len(cycle) == period - 1:
+        unfaced = [p for p in ALL_PLAYERS if p != player and p not in cycle]
+        if len(unfaced) == 1:
+            cycle.append(unfaced[0])
+    if len(cycle) < period or player in cycle or len(set(cycle)) != period:
+        return None
+    if any(opp != cycle[t % period] for t, opp in enumerate(opponents)):
+        return None
+
+    after_last = fights[-1][0] + 1
+    full_lobby = tm.position.any(axis=(0, 2)) & (tm.alive.sum(axis=1) == NUM_PLAYERS)
+    confidence = round(template.confidence * 100, 1)
+    schedule = [
+        {"round": ROUND_LIST[idx], "opponent": cycle[t % period], "confidence": confidence}
+        for t, idx in enumerate(np.flatnonzero(full_lobby[after_last:]) + after_last, start=len(fights))
+        if idx > current_round_idx
+    ]
+    if not schedule:
+        return None
+
+    expected = schedule[0]["opponent"]
+    others = [p for p in ALL_PLAYERS if p not in (player, expected)]
+    ranked = [(expected, template.confidence)] + [(p, (1 - template.confidence) / len(others)) for p in others]
+    return {
+        "template": {"period": period, "confidence": confidence},
+        "schedule": schedule,
+        "next_predictions": format_predictions(player, ranked, set(others)),
+    }
+
+
+# ═══════════════════════════════════════════════════════════════════════════
+#  BACKGROUND REBUILD
+# ═══════════════════════════════════════════════════════════════════════════
+
+class RebuildJob:
+    """A full model rebuild running on a background thread.
+
+    Phases are timed separately (parse and count interleave per file, so
+    their times accumulate; derive covers every serving structure built from
+    the counts). The corpus is counted without holding the model write lock
+    (see model_writer), so matches can still be ingested meanwhile, by this
+    worker or another. The lock is taken only to
+    compare the files on disk with those counted, fold in any that changed
+    (see apply_manifest_delta), save and publish. Requests keep using the
+    current model until the job finishes.
+    """
+
+    PHASES = ("discover", "parse", "count", "derive", "persist")
+
+    def __init__(self):
+        self.id = uuid.uuid4().hex[:12]
+        self.state = "running"  # → "succeeded" | "failed"
+        self.phase: Optional[str] = None
+        self.timings = dict.fromkeys(self.PHASES, 0.0)
+        self.files_total = 0
+        self.files_done = 0
+        self.started_at = datetime.now().isoformat()
+        self.finished_at: Optional[str] = None
+        self.error: Optional[str] = None
+        self.models: Optional[ModelSnapshot] = None
+        self.done = threading.Event()
+
+    @contextmanager
+    def _timed(self, phase: str):
+        self.phase = phase
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[phase] += time.perf_counter() - start
+
+    def run(self) -> None:
+        try:
+            with self._timed("discover"):
+                manifest = scan_match_files()
+            self.files_total = len(manifest)
+
+            loaded: Dict[str, dict] = {}
+            counts: List[MatchCounts] = []
+            for name, fp in manifest.items():
+                with self._timed("parse"):
+                    c = load_match_counts(fp["sha256"])
+                    matrix = load_match_file(name) if c is None else None
+                if c is None and matrix is not None:
+                    with self._timed("count"):
+                        c = count_match(matrix)
+                        save_match_counts(c, fp["sha256"])
+                if c is not None:
+                    loaded[name] = fp
+                    counts.append(c)
+                self.files_done += 1
+
+            with self._timed("count"):
+                combined = combine_match_counts(counts)
+            with self._timed("derive"):
+                models = build_snapshot(*combined, loaded)
+
+            with model_writer():
+                # Matches ingested while counting are on disk by now
+                with self._timed("discover"):
+                    latest = scan_match_files(previous=manifest)
+                if manifest_changed(manifest, latest):
+                    with self._timed("count"):
+                        updated = apply_manifest_delta(combined, loaded, latest)
+                    if updated is None:
+                        raise RuntimeError("Match files changed during rebuild; retry")
+                    with self._timed("derive"):
+                        models = build_snapshot(*updated)
+                with self._timed("persist"):
+                    save_models(models)
+                self.models = publish_snapshot(models)
+            self.state = "succeeded"
+            log.info("Rebuild %s finished: model %s from %d matches", self.id, models.version, models.match_count)
+        except Exception as e:
+            log.exception("Model rebuild %s failed", self.id)
+            self.state, self.error = "failed", str(e)
+        finally:
+            self.phase = None
+            self.finished_at = datetime.now().isoformat()
+            self.done.set()
+
+    def status(self) -> dict:
+        status = {
+            "id": self.id,
+            "state": self.state,
+            "phase": self.phase,
+            "progress": {"files_done": self.files_done, "files_total": self.files_total},
+            "timings_ms": {phase: round(t * 1000, 1) for phase, t in self.timings.items()},
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+        if self.models is not None:
+            status.update(
+                matches_reloaded=self.models.match_count,
+                model_version=self.models.version,
+                transition_entries=len(self.models.transition_model),
+                position_entries=len(self.models.position_model),
+                bigram_entries=len(self.models.bigram_model),
+            )
+        if self.error is not None:
+            status["error"] = self.error
+        return status
+
+
+# The most recent rebuild; a new one starts only once it has finished
+rebuild_job: Optional[RebuildJob] = None
+rebuild_job_lock = threading.Lock()
+
+
+def start_rebuild() -> Tuple[RebuildJob, bool]:
+    """Start a background rebuild, or join the one already running.
+
+    Returns (job, started) where *started* is False if an existing job was joined.
+    """
+    global rebuild_job
+    with rebuild_job_lock:
+        if rebuild_job is not None and not rebuild_job.done.is_set():
+            return rebuild_job, False
+        rebuild_job = RebuildJob()
+        threading.Thread(target=rebuild_job.run, name=f"rebuild-{rebuild_job.id}", daemon=True).start()
+        return rebuild_job, True
+
+
+# ═══════════════════════════════════════════════════════════════════════════
+#  REQUEST COALESCING
+# ═══════════════════════════════════════════════════════════════════════════
+
+class Histogram:
+    """Bucketed counts of observations: bucket i holds values <= bounds[i]."""
+
+    def __init__(self, bounds: Tuple[float, ...]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # last bucket: above every bound
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+
+    def snapshot(self) -> dict:
+        bounds = list(self.bounds) + ["+Inf"]
+        return {
+            "count": self.count,
+            "mean": round(self.total / self.count, 3) if self.count else None,
+            "buckets": [{"le": b, "count": n} for b, n in zip(bounds, self.counts)],
+        }
+
+
+class PredictionCoalescer:
+    """Score concurrent /api/predict queries together in micro-batches.
+
+    Request threads enqueue their parsed query and block. A dispatcher
+    thread waits until *window_ms* after the oldest queued query (or until
+    *max_batch* are queued), scores the batch in one vectorised pass per
+    model snapshot, and completes each request with its own result. Each
+    query is scored against the snapshot its request captured, so a model
+    published mid-batch does not leak into responses (or cache entries)
+    keyed by the old version.
+    """
+
+    BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512)
+    QUEUE_WAIT_BUCKETS_MS = (0.1, 0.25, 0.5, 1, 2, 5, 10, 25, 50)
+
+    def __init__(self, window_ms: float, max_batch: int):
+        self.window = window_ms / 1000
+        self.max_batch = max_batch
+        self.pending: List[Tuple[tuple, ModelSnapshot, float, Future]] = []
+        self.cond = threading.Condition()
+        self.dispatcher: Optional[threading.Thread] = None
+        self.batch_sizes = Histogram(self.BATCH_SIZE_BUCKETS)
+        self.queue_wait_ms = Histogram(self.QUEUE_WAIT_BUCKETS_MS)
+
+    def submit(self, query: tuple, models: ModelSnapshot) -> List[dict]:
+        """Queue a parse_prediction_query result and wait for its predictions under *models*."""
+        future: Future = Future()
+        with self.cond:
+            # Started lazily so forked workers each get their own thread
+            if self.dispatcher is None or not self.dispatcher.is_alive():
+                self.dispatcher = threading.Thread(target=self._run, name="predict-coalescer", daemon=True)
+                self.dispatcher.start()
+            self.pending.append((query, models, time.perf_counter(), future))
+            if len(self.pending) == 1 or len(self.pending) >= self.max_batch:
+                self.cond.notify()
+        return future.result()
+
+    def _run(self) -> None:
+        while True:
+            with self.cond:
+                while not self.pending:
+                    self.cond.wait()
+                deadline = self.pending[0][2] + self.window
+                while len(self.pending) < self.max_batch:
+                    remaining = deadline - time.perf_counter()
+                    if remaining <= 0:
+                        break
+                    self.cond.wait(remaining)
+                batch = self.pending[:self.max_batch]
+                del self.pending[:self.max_batch]
+            self._score(batch)
+
+    def _score(self, batch: List[Tuple[tuple, ModelSnapshot, float, Future]]) -> None:
+        now = time.perf_counter()
+        self.batch_sizes.observe(len(batch))
+        by_snapshot: Dict[int, List[Tuple[tuple, ModelSnapshot, float, Future]]] = {}
+        for item in batch:
+            self.queue_wait_ms.observe((now - item[2]) * 1000)
+            by_snapshot.setdefault(id(item[1]), []).append(item)
+
+        for items in by_snapshot.values():
+            try:
+                preds = predict_queries([query for query, _, _, _ in items], items[0][1])
+            except Exception as e:
+                for _, _, _, future in items:
+                    future.set_exception(e)
+                continue
+            for (_, _, _, future), result in zip(items, preds):
+                future.set_result(result)
+
+    def stats(self) -> dict:
+        return {
+            "window_ms": self.window * 1000,
+            "max_batch": self.max_batch,
+            "queued": len(self.pending),
+            "batch_size": self.batch_sizes.snapshot(),
+            "queue_wait_ms": self.queue_wait_ms.snapshot(),
+        }
+
+
+predict_coalescer: Optional[PredictionCoalescer] = (
+    PredictionCoalescer(PREDICT_COALESCE_MS, PREDICT_COALESCE_MAX_BATCH) if PREDICT_COALESCE_MS > 0 else None
+)
+
+
+class SingleFlight:
+    """Share one computation among concurrent callers with the same key.
+
+    The first caller for a key (the leader) runs the function; callers that
+    arrive while it is running wait for and return the leader's result (or
+    exception) instead of recomputing. Nothing is kept once it finishes.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.in_flight: Dict[tuple, Future] = {}
+        self.leaders = 0
+        self.shared = 0
+
+    def do(self, key: tuple, fn: Callable[[], Any]) -> Any:
+        with self.lock:
+            future = self.in_flight.get(key)
+            leader = future is None
+            if leader:
+                future = self.in_flight[key] = Future()
+                self.leaders += 1
+            else:
+                self.shared += 1
+        if not leader:
+            return future.result()
+
+        try:
+            result = fn()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self.lock:
+                del self.in_flight[key]
+
+    def stats(self) -> dict:
+        return {"computed": self.leaders, "shared": self.shared, "in_flight": len(self.in_flight)}
+
+
+# Identical concurrent /api/predict calls share one scoring + serialisation
+prediction_flight = SingleFlight()
+
+
+# ═══════════════════════════════════════════════════════════════════════════
+#  PREDICTION CACHE
+# ═══════════════════════════════════════════════════════════════════════════
+
+class RenderedPrediction(NamedTuple):
+    """A scored /api/predict query and its serialised response body.
+
+    *body* is the compact, key-sorted JSON object minus its closing brace;
+    the per-response "timestamp" (the last key) is appended when served.
+    """
+    predictions: List[dict]
+    body: bytes
+
+    def response_body(self) -> bytes:
+        return b'%s,"timestamp":"%s"}\n' % (self.body, datetime.now().isoformat().encode())
+
+
+class PredictionCache:
+    """Bounded LRU of rendered predictions, keyed by prediction_key.
+
+    Keys include the model version, so entries can never be served against
+    a different model; publish_snapshot also clears the cache so stale
+    entries do not hold memory until they age out.
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self.entries: "OrderedDict[tuple, RenderedPrediction]" = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = self.misses = self.evictions = self.invalidations = 0
+
+    def get(self, key: tuple) -> Optional[RenderedPrediction]:
+        with self.lock:
+            value = self.entries.get(key)
+            if value is None:
+                self.misses += 1
+            else:
+                self.entries.move_to_end(key)
+                self.hits += 1
+            return value
+
+    def put(self, key: tuple, value: RenderedPrediction) -> None:
+        if self.max_entries <= 0:
+            return
+        with self.lock:
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self.lock:
+            self.invalidations += 1
+            self.entries.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self.entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
+
+
+prediction_cache = PredictionCache(PREDICTION_CACHE_SIZE)
+
+
+# ═══════════════════════════════════════════════════════════════════════════
+#  GAME SESSIONS
+# ═══════════════════════════════════════════════════════════════════════════
+
+class GameSession:
+    """Server-side prediction context for one player's game.
+
+    Only what the next prediction needs is kept: the last two opponents,
+    the current round, the eliminated set, and the fights so far for the
+    schedule template (at most one per round). A session's size and the
+    cost of each update are therefore bounded however far into the match
+    it is.
+    """
+
+    def __init__(self, player: str):
+        self.id = uuid.uuid4().hex
+        self.player = player
+        self.current_round: Optional[str] = None
+        self.last_opponent: Optional[str] = None
+        self.previous_opponent: Optional[str] = None
+        self.eliminated: set = set()
+        self.fights: List[Tuple[int, str]] = []
+        self.rounds_tracked = 0
+        self.predictions: Optional[List[dict]] = None
+        self.schedule: List[dict] = []
+        self.created_at = datetime.now().isoformat()
+        self.touched = time.monotonic()
+        self.lock = threading.Lock()  # serialises updates to this session
+
+    def record_round(self, round_label: str, opponent: Optional[str], eliminated: List[str]) -> None:
+        """Advance to *round_label*, which the caller has checked is later than current_round."""
+        self.current_round = round_label
+        if opponent:
+            self.previous_opponent, self.last_opponent = self.last_opponent, opponent
+            self.fights.append((ROUND_INDEX[round_label], opponent))
+        self.eliminated.update(eliminated)
+        self.rounds_tracked += 1
+
+    def query(self) -> Optional[tuple]:
+        """The parse_prediction_query-style tuple for the next prediction, if any."""
+        if self.last_opponent is None:
+            return None
+        return (self.player, self.current_round, self.last_opponent, self.previous_opponent, frozenset(self.eliminated))
+
+    def state(self) -> dict:
+        return {
+            "session_id": self.id,
+            "player": self.player,
+            "current_round": self.current_round,
+            "next_round": get_next_round(self.current_round) if self.current_round else None,
+            "last_opponent": self.last_opponent,
+            "previous_opponent": self.previous_opponent,
+            "eliminated": sorted(self.eliminated),
+            "alive_count": len(ALL_PLAYERS) - len(self.eliminated),
+            "rounds_tracked": self.rounds_tracked,
+            "next_predictions": self.predictions,
+            "schedule": self.schedule,
+        }
+
+
+class SessionStore:
+    """Sessions in least-recently-used order, with idle TTL and a count cap.
+
+    Expired sessions are dropped from the LRU end whenever the store is
+    touched, and the least recently used one is evicted when a new session
+    would exceed *max_sessions*, so memory is bounded without a sweeper.
+    """
+
+    def __init__(self, ttl_seconds: float, max_sessions: int):
+        self.ttl = ttl_seconds
+        self.max_sessions = max_sessions
+        self.sessions: "OrderedDict[str, GameSession]" = OrderedDict()
+        self.lock = threading.Lock()
+        self.expired = self.evicted = 0
+
+    def _expire(self, now: float) -> None:
+        while self.sessions:
+            oldest = next(iter(self.sessions.values()))
+            if now - oldest.touched < self.ttl:
+                break
+            self.sessions.popitem(last=False)
+            self.expired += 1
+
+    def create(self, player: str) -> GameSession:
+        session = GameSession(player)
+        with self.lock:
+            self._expire(session.touched)
+            self.sessions[session.id] = session
+            while len(self.sessions) > self.max_sessions:
+                self.sessions.popitem(last=False)
+                self.evicted += 1
+        return session
+
+    def get(self, session_id: str) -> Optional[GameSession]:
+        """Return a live session and mark it used, or None if unknown/expired."""
+        now = time.monotonic()
+        with self.lock:
+            self._expire(now)
+            session = self.sessions.get(session_id)
+            if session is not None:
+                session.touched = now
+                self.sessions.move_to_end(session_id)
+            return session
+
+    def delete(self, session_id: str) -> bool:
+        with self.lock:
+            return self.sessions.pop(session_id, None) is not None
+
+    def stats(self) -> dict:
+        return {
+            "active": len(self.sessions),
+            "max_sessions": self.max_sessions,
+            "ttl_seconds": self.ttl,
+            "expired": self.expired,
+            "evicted": self.evicted,
+        }
+
+
+session_store = SessionStore(SESSION_TTL_SECONDS, MAX_SESSIONS)
+
+
+class Subscription:
+    """One event-stream subscriber's bounded queue of formatted SSE messages.
+
+    Publishing never blocks: when a slow subscriber's queue is full the
+    oldest message is dropped, since newer predictions supersede it.
+    *notify*, if given, is called after each message is queued, from the
+    publishing thread; asgi.py uses it to wake a coroutine.
+    """
+
+    def __init__(self, maxsize: int, notify: Optional[Callable[[], None]] = None):
+        self.queue: "queue.Queue[str]" = queue.Queue(maxsize)
+        self.notify = notify
+        self.dropped = 0
+
+    def push(self, event: str, data: dict) -> None:
+        message = f"event: {event}\ndata: {app.json.dumps(data)}\n\n"
+        while True:
+            try:
+                self.queue.put_nowait(message)
+                if self.notify is not None:
+                    self.notify()
+                return
+            except queue.Full:
+                try:
+                    self.queue.get_nowait()
+                    self.dropped += 1
+                except queue.Empty:
+                    pass
+
+
+class EventHub:
+    """Routes session events to their subscribers and model events to everyone.
+
+    At most *max_subscribers* streams are open at once in this process.
+    """
+
+    def __init__(self, max_subscribers: int):
+        self.lock = threading.Lock()
+        self.subscribers: Dict[str, set] = defaultdict(set)
+        self.max_subscribers = max_subscribers
+        self.open = 0
+        self.rejected = 0
+
+    def subscribe(
+        self, session_id: str, notify: Optional[Callable[[], None]] = None,
+    ) -> Optional[Subscription]:
+        """Open a subscription, or return None if the process is at its limit."""
+        sub = Subscription(SSE_QUEUE_SIZE, notify)
+        with self.lock:
+            if self.open >= self.max_subscribers:
+                self.rejected += 1
+                return None
+            self.subscribers[session_id].add(sub)
+            self.open += 1
+        return sub
+
+    def unsubscribe(self, session_id: str, sub: Subscription) -> None:
+        with self.lock:
+            subs = self.subscribers.get(session_id)
+            if subs is not None and sub in subs:
+                subs.discard(sub)
+                self.open -= 1
+                if not subs:
+                    del self.subscribers[session_id]
+
+    def publish(self, session_id: str, event: str, data: dict) -> None:
+        with self.lock:
+            subs = list(self.subscribers.get(session_id, ()))
+        for sub in subs:
+            sub.push(event, data)
+
+    def broadcast(self, event: str, data: dict) -> None:
+        with self.lock:
+            subs = [sub for subs in self.subscribers.values() for sub in subs]
+        for sub in subs:
+            sub.push(event, data)
+
+    def stats(self) -> dict:
+        with self.lock:
+            subs = [sub for subs in self.subscribers.values() for sub in subs]
+        return {
+            "subscribers": len(subs),
+            "max_subscribers": self.max_subscribers,
+            "rejected": self.rejected,
+            "dropped": sum(sub.dropped for sub in subs),
+        }
+
+
+event_hub = EventHub(SSE_MAX_SUBSCRIBERS)
+
+
+def predict_for_session(session: GameSession) -> Optional[List[dict]]:
+    """Predict the session's next opponent.
+
+    While the game matches its schedule template, the answer (and
+    session.schedule, the rest of the schedule) comes from
+    predict_schedule; otherwise it goes through the shared prediction cache.
+    """
+    query = session.query()
+    if query is None:
+        return None
+    models = model_snapshot
+    answer = predict_schedule(
+        session.player, ROUND_INDEX[session.current_round], session.fights, session.eliminated, models,
+    )
+    session.schedule = answer["schedule"] if answer else []
+    if answer:
+        return answer["next_predictions"]
+    key = prediction_key(query, models)
+    rendered = prediction_cache.get(key)
+    if rendered is None:
+        rendered = prediction_flight.do(key, lambda: cache_prediction(key, query, models))
+    return rendered.predictions
+
+
+# ═══════════════════════════════════════════════════════════════════════════
+#  API ROUTES
+# ═══════════════════════════════════════════════════════════════════════════
+
+def parse_prediction_query(data) -> Tuple[Optional[tuple], List[str]]:
+    """Validate one /api/predict-style query.
+
+    Returns ((player, current_round, last_opponent, previous_opponent,
+    eliminated set), []) or (None, errors).
+    """
+    if not isinstance(data, dict):
+        return None, ["Query must be a JSON object"]
+
+    # ── Field types ──
+    errors = []
+    for field in ("player", "current_round", "last_opponent", "previous_opponent"):
+        if not isinstance(data.get(field) or "", str):
+            errors.append(f"'{field}' must be a string")
+    raw_eliminated = data.get("eliminated") or []
+    if not (isinstance(raw_eliminated, list) and all(isinstance(e, str) for e in raw_eliminated)):
+        errors.append("'eliminated' must be a list of player IDs")
+    if errors:
+        return None, errors
+
+    player = (data.get("player") or "").strip()
+    current_round = (data.get("current_round") or "I-1").strip()
+    last_opponent = (data.get("last_opponent") or "").strip()
+    previous_opponent = (data.get("previous_opponent") or "").strip() or None
+    eliminated = set(raw_eliminated)
+
+    # ── Validation ──
+    if not player:
+        errors.append("'player' is required")
+    elif player not in PLAYER_IDS:
+        errors.append(f"Invalid player '{player}'. Must be one of {ALL_PLAYERS}")
+
+    if not last_opponent:
+        errors.append("'last_opponent' is required")
+
+    if current_round not in ROUND_INDEX:
+        errors.append(f"Invalid round '{current_round}'. Must be one of {ROUND_LIST}")
+
+    if errors:
+        return None, errors
+    return (player, current_round, last_opponent, previous_opponent, eliminated), []
+
+
+def prediction_results(
+    parsed: List[Tuple[Optional[tuple], List[str]]],
+    models: Optional[ModelSnapshot] = None,
+) -> List[dict]:
+    """Score parse_prediction_query outputs together; one result per input, in order."""
+    valid = [query for query, errors in parsed if not errors]
+    preds = iter(predict_queries(valid, models) if valid else [])
+
+    results = []
+    for query, errors in parsed:
+        if errors:
+            results.append({"success": False, "errors": errors})
+            continue
+        player, current_round, last_opponent, previous_opponent, eliminated = query
+        results.append({
+            "success": True,
+            "player": player,
+            "current_round": current_round,
+            "next_round": get_next_round(current_round),
+            "last_opponent": last_opponent,
+            "previous_opponent": previous_opponent,
+            "eliminated": sorted(eliminated),
+            "alive_count": len(ALL_PLAYERS) - len(eliminated),
+            "next_predictions": next(preds),
+        })
+    return results
+
+
+class PredictionStream:
+    """Incremental scorer behind /api/predict-stream, shared with asgi.py.
+
+    Lines are fed one at a time; every STREAM_BATCH_SIZE queries the batch
+    is scored and its NDJSON output returned, so the caller can write it
+    out before reading more input. A line that fails to parse becomes that
+    line's error result and the stream carries on.
+    """
+
+    def __init__(self, models: ModelSnapshot):
+        self.models = models
+        self.batch: List[Tuple[Optional[tuple], List[str]]] = []
+
+    def feed(self, line) -> str:
+        """Queue one input line; returns output to send ("" until a batch fills)."""
+        if not line.strip():
+            return ""
+        try:
+            self.batch.append(parse_prediction_query(json.loads(line)))
+        except ValueError as e:
+            self.batch.append((None, [f"Invalid JSON: {e}"]))
+        except Exception:
+            # One bad line must not cost the queries around it
+            log.exception("Streaming prediction parse error")
+            self.batch.append((None, ["Invalid query"]))
+        return self.flush() if len(self.batch) >= STREAM_BATCH_SIZE else ""
+
+    def flush(self) -> str:
+        """Score whatever is queued and return its output."""
+        batch, self.batch = self.batch, []
+        return "".join(app.json.dumps(result) + "\n" for result in prediction_results(batch, self.models))
+
+
+def prediction_key(query: tuple, models: ModelSnapshot) -> tuple:
+    """Normalised identity of a parsed /api/predict query under a given model."""
+    player, current_round, last_opponent, previous_opponent, eliminated = query
+    return (models.version, player, current_round, last_opponent, previous_opponent, frozenset(eliminated))
+
+
+def render_prediction(query: tuple, models: ModelSnapshot, coalesce: bool = True) -> RenderedPrediction:
+    """Score a parsed /api/predict query and serialise the response body."""
+    player, current_round, last_opponent, previous_opponent, eliminated = query
+    round_idx = round_to_absolute_index(current_round)
+
+    # Coalescing mode scores concurrent requests together; otherwise the
+    # common case (no eliminations) is a single table lookup
+    preds = None
+    if coalesce and predict_coalescer is not None:
+        preds = predict_coalescer.submit(query, models)
+    elif not eliminated:
+        preds = lookup_prediction(player, round_idx, last_opponent, previous_opponent, models)
+    if preds is None:
+        preds = predict_next_opponent(
+            player, round_idx, last_opponent,
+            previous_opponent=previous_opponent,
+            eliminated=eliminated,
+            models=models,
+        )
+
+    next_round = get_next_round(current_round)
+
+    body = app.json.dumps({
+        "success": True,
+        "player": player,
+        "current_round": current_round,
+        "next_round": next_round,
+        "last_opponent": last_opponent,
+        "previous_opponent": previous_opponent,
+        "eliminated": sorted(eliminated),
+        "alive_count": len(ALL_PLAYERS) - len(eliminated),
+        "next_predictions": preds,
+    }, separators=(",", ":"))
+    return RenderedPrediction(preds, body[:-1].encode())
+
+
+def cache_prediction(
+    key: tuple,
+    query: tuple,
+    models: ModelSnapshot,
+    coalesce: bool = True,
+) -> RenderedPrediction:
+    rendered = render_prediction(query, models, coalesce)
+    prediction_cache.put(key, rendered)
+    return rendered
+
+
+def json_bytes(payload: dict) -> bytes:
+    """Serialise *payload* exactly as jsonify would, without a request context."""
+    return app.json.response(payload).get_data()
+
+
+def cors_headers(origin: Optional[str]) -> List[Tuple[str, str]]:
+    """The headers flask_cors adds to a simple (non-preflight) response."""
+    if origin is None:
+        return [("Access-Control-Allow-Origin", "*")]
+    return [("Access-Control-Allow-Origin", origin), ("Vary", "Origin")]
+
+
+def predict_response(data, coalesce: bool = True) -> Tuple[bytes, int]:
+    """Answer an /api/predict body as (JSON bytes, status).
+
+    Independent of the web framework so the ASGI and raw WSGI entry points
+    (asgi.py, wsgi.py) can share it; the ASGI one passes coalesce=False,
+    since the coalescer blocks its caller until the batch is scored.
+    """
+    try:
+        query, errors = parse_prediction_query(data or {})
+        if errors:
+            return json_bytes({"success": False, "errors": errors}), 400
+
+        models = model_snapshot
+        key = prediction_key(query, models)
+        rendered = prediction_cache.get(key)
+        if rendered is None:
+            rendered = prediction_flight.do(key, lambda: cache_prediction(key, query, models, coalesce))
+        return rendered.response_body(), 200
+
+    except Exception:
+        log.exception("Prediction error")
+        return json_bytes({"success": False, "error": "Internal server error"}), 500
+
+
+def predict_batch_response(data) -> Tuple[bytes, int]:
+    """Answer an /api/predict-batch body as (JSON bytes, status)."""
+    try:
+        data = data or {}
+        player = (data.get("player") or "").strip()
+        history: List[dict] = data.get("history", [])
+
+        if not player:
+            return json_bytes({"success": False, "error": "'player' is required"}), 400
+        if player not in ALL_PLAYERS:
+            return json_bytes({"success": False, "error": f"Invalid player '{player}'"}), 400
+
+        results = predict_chain(player, history)
+        return json_bytes({
+            "success": True,
+            "player": player,
+            "predictions_history": results,
+        }), 200
+
+    except Exception:
+        log.exception("Batch prediction error")
+        return json_bytes({"success": False, "error": "Internal server error"}), 500
+
+
+class CachedBody(NamedTuple):
+    """A serialised GET response and its strong ETag."""
+    version: Optional[str]
+    body: bytes
+    etag: str
+
+
+# Serialised GET bodies by endpoint name, each for one model version at a time
+cached_bodies: Dict[str, CachedBody] = {}
+
+
+def cached_json(name: str, version: Optional[str], build: Callable[[], dict]):
+    """Serve a JSON body that only changes with *version* (None = never).
+
+    The body is built and serialised once per version. Responses carry a
+    strong ETag (a hash of the bytes, so every worker agrees) and
+    Cache-Control, and a matching If-None-Match gets an empty 304.
+    """
+    cached = cached_bodies.get(name)
+    if cached is None or cached.version != version:
+        body = jsonify(build()).get_data()
+        cached = cached_bodies[name] = CachedBody(version, body, hashlib.sha256(body).hexdigest()[:32])
+
+    response = app.response_class(cached.body, mimetype=app.json.mimetype)
+    response.set_etag(cached.etag)
+    response.headers["Cache-Control"] = STATIC_CACHE_CONTROL if version is None else MODEL_CACHE_CONTROL
+    return response.make_conditional(request)
+
+
+@app.route("/api/health", methods=["GET"])
+def health():
+    models = model_snapshot
     return jsonify({
-        "matches_loaded": match_count,
-        "transition_entries": len(transition_model),
-        "position_entries": len(position_model),
-        "bigram_entries": len(bigram_model),
+        "status": "ok",
+        "matches_loaded": models.match_count,
+        "model_version": models.version,
+        "models_cached": os.path.exists(os.path.join(MODEL_ARTIFACT_DIR, MODEL_VERSION_MARKER)),
+        "timestamp": datetime.now().isoformat(),
+    })
+
+
+@app.route("/api/players", methods=["GET"])
+def get_players():
+    return cached_json("players", None, lambda: {"players": ALL_PLAYERS})
+
+
+@app.route("/api/rounds", methods=["GET"])
+def get_rounds():
+    """Return the canonical round list for the frontend."""
+    return cached_json("rounds", None, lambda: {"rounds": ROUND_LIST})
+
+
+@app.route("/api/stats", methods=["GET"])
+def get_stats():
+    """Return model statistics for debugging / transparency.
+
+    Live serving counters are at /api/stats/runtime, so this body depends
+    only on the model version and can be cached by clients and CDNs.
+    """
+    models = model_snapshot
+    template = schedule_template(models.tensors)
+    return cached_json("stats", models.version, lambda: {
+        "matches_loaded": models.match_count,
+        "model_version": models.version,
+        "transition_entries": len(models.transition_model),
+        "position_entries": len(models.position_model),
+        "bigram_entries": len(models.bigram_model),
+        "matching_transitions": int(np.count_nonzero(models.tensors.matching)),
+        "rematch_windows": models.tensors.rematch_window.tolist(),
+        "lobby_sizes": models.tensors.lobby_size.tolist(),
+        "schedule_template": template._asdict() if template else None,
         "rounds_tracked": len(ROUND_LIST),
-        "round_alive_estimates": len(round_alive_estimates),
+        "round_alive_estimates": len(models.round_alive_estimates),
+        "model_backend": MODEL_BACKEND,
+        "elimination_model": ELIMINATION_MODEL,
+        "prediction_table_entries": models.table.entries,
         "players": ALL_PLAYERS,
     })
 
 
+@app.route("/api/stats/runtime", methods=["GET"])
+def get_runtime_stats():
+    """Live serving counters of the worker process that answers."""
+    return jsonify({
+        "pid": os.getpid(),
+        "coalescer": predict_coalescer.stats() if predict_coalescer is not None else None,
+        "single_flight": prediction_flight.stats(),
+        "prediction_cache": prediction_cache.stats(),
+        "sessions": session_store.stats(),
+        "event_streams": event_hub.stats(),
+    })
+
+
 @app.route("/api/predict", methods=["POST"])
 def predict():
     """Predict the next opponent.
@@ -489,58 +2935,238 @@ def predict():
         last_opponent  — e.g. "Player 5"
         previous_opponent (optional) — e.g. "Player 2"  (for bigram context)
     """
+    body, status = predict_response(request.get_json(silent=True))
+    return app.response_class(body, status=status, mimetype=app.json.mimetype)
+
+
+def parse_pairings(pairs, field: str) -> Tuple[Dict[str, str], List[str]]:
+    """Validate a list of [player, player] pairs as one round's pairings."""
+    if pairs is None:
+        return {}, []
+    if not isinstance(pairs, list):
+        return {}, [f"'{field}' must be a list of [player, player] pairs"]
+    opponents: Dict[str, str] = {}
+    for pair in pairs:
+        if not (isinstance(pair, list) and len(pair) == 2 and all(p in PLAYER_IDS for p in pair)) or pair[0] == pair[1]:
+            return {}, [f"Invalid pair {pair!r} in '{field}'"]
+        a, b = pair
+        if a in opponents or b in opponents:
+            return {}, [f"A player appears twice in '{field}'"]
+        opponents[a], opponents[b] = b, a
+    return opponents, []
+
+
+@app.route("/api/predict-lobby", methods=["POST"])
+def predict_lobby_route():
+    """Predict the next opponent of every alive player in one call.
+
+    Request body (JSON):
+        current_round     — e.g. "III-4"
+        pairings          — the round just played, e.g. [["Player 1", "Player 5"], ...]
+        previous_pairings (optional) — the round before it, same shape
+        eliminated        (optional) — e.g. ["Player 2"]
+        model             (optional) — "seat" (default) or "matching"
+
+    Probabilities are reconciled across players, so P(A faces B) equals
+    P(B faces A); see predict_lobby. The "matching" model predicts the whole
+    next pairing from the last one (see predict_lobby_matching) and also
+    returns the likeliest next pairings; it needs a full, uneliminated
+    lobby and falls back to "seat" otherwise. "model" in the response says
+    which one answered.
+    """
     try:
         data = request.get_json(silent=True) or {}
-        player = (data.get("player") or "").strip()
-        current_round = (data.get("current_round") or "I-1").strip()
-        last_opponent = (data.get("last_opponent") or "").strip()
-        previous_opponent = (data.get("previous_opponent") or "").strip() or None
-        eliminated = set(data.get("eliminated") or [])
+        if not isinstance(data, dict):
+            return jsonify({"success": False, "error": "Body must be a JSON object"}), 400
+        current_round = (data.get("current_round") or "").strip()
+        eliminated = data.get("eliminated") or []
+        last, errors = parse_pairings(data.get("pairings"), "pairings")
+        previous, previous_errors = parse_pairings(data.get("previous_pairings"), "previous_pairings")
+        errors += previous_errors
+        if current_round not in ROUND_INDEX:
+            errors.append(f"Invalid round '{current_round}'. Must be one of {ROUND_LIST}")
+        if not isinstance(eliminated, list) or not all(name in PLAYER_IDS for name in eliminated):
+            errors.append(f"'eliminated' must be a list of players from {ALL_PLAYERS}")
+        model = data.get("model", "seat")
+        if model not in ("seat", "matching"):
+            errors.append("'model' must be \"seat\" or \"matching\"")
+        if errors:
+            return jsonify({"success": False, "errors": errors}), 400
 
-        # ── Validation ──
-        errors = []
-        if not player:
-            errors.append("'player' is required")
-        elif player not in ALL_PLAYERS:
-            errors.append(f"Invalid player '{player}'. Must be one of {ALL_PLAYERS}")
+        eliminated = set(eliminated)
+        round_idx = ROUND_INDEX[current_round]
+        result = predict_lobby_matching(round_idx, last) if model == "matching" and not eliminated else None
+        extra = {}
+        if result is not None:
+            lobby, dist = result
+            extra["likely_pairings"] = [
+                {"pairings": matching_pairs(m), "probability": round(float(dist[m]) * 100, 1)}
+                for m in np.argsort(-dist, kind="stable")[:3].tolist() if dist[m] > 0
+            ]
+        else:
+            model = "seat"
+            lobby = predict_lobby(round_idx, last, previous, eliminated)
+        for player, entry in lobby.items():
+            entry.update(last_opponent=last.get(player), previous_opponent=previous.get(player))
+        return jsonify({
+            "success": True,
+            "current_round": current_round,
+            "next_round": get_next_round(current_round),
+            "eliminated": sorted(eliminated),
+            "alive_count": len(ALL_PLAYERS) - len(eliminated),
+            "model": model,
+            "players": lobby,
+            **extra,
+        })
 
-        if not last_opponent:
-            errors.append("'last_opponent' is required")
+    except Exception:
+        log.exception("Lobby prediction error")
+        return jsonify({"success": False, "error": "Internal server error"}), 500
 
-        if current_round not in ROUND_LIST:
-            errors.append(f"Invalid round '{current_round}'. Must be one of {ROUND_LIST}")
 
-        if errors:
-            return jsonify({"success": False, "errors": errors}), 400
+@app.route("/api/predict-schedule", methods=["POST"])
+def predict_schedule_route():
+    """Predict a player's remaining full-lobby schedule from the fights so far.
 
-        round_idx = round_to_absolute_index(current_round)
+    Request body (JSON):
+        player        — e.g. "Player 1"
+        fights        — the player's fights so far, in order,
+                        e.g. [{"round": "I-2", "opponent": "Player 5"}, ...]
+        current_round (optional) — defaults to the last fight's round
+        eliminated    (optional) — e.g. ["Player 2"]
+
+    When the fights match the game's schedule template, every remaining
+    full-lobby round is answered at once ("source": "template"; see
+    predict_schedule). Otherwise only the next round is predicted, by
+    predict_next_opponent ("source": "model", empty "schedule").
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        if not isinstance(data, dict):
+            return jsonify({"success": False, "error": "Body must be a JSON object"}), 400
+        player = (data.get("player") or "").strip()
+        fights = data.get("fights")
+        eliminated = data.get("eliminated") or []
 
-        preds = predict_next_opponent(
-            player, round_idx, last_opponent,
-            previous_opponent=previous_opponent,
-            eliminated=eliminated,
+        errors = []
+        if player not in PLAYER_IDS:
+            errors.append(f"Invalid player '{player}'. Must be one of {ALL_PLAYERS}")
+        history: List[Tuple[int, str]] = []
+        if not isinstance(fights, list) or not fights:
+            errors.append("'fights' must be a non-empty list of {\"round\", \"opponent\"} objects")
+        else:
+            for fight in fights:
+                if not isinstance(fight, dict):
+                    errors.append(f"Invalid fight {fight!r}")
+                    break
+                round_label, opponent = fight.get("round"), fight.get("opponent")
+                if round_label not in ROUND_INDEX or opponent not in PLAYER_IDS or opponent == player:
+                    errors.append(f"Invalid fight {fight!r}")
+                    break
+                if history and ROUND_INDEX[round_label] <= history[-1][0]:
+                    errors.append("'fights' must be in round order, one per round")
+                    break
+                history.append((ROUND_INDEX[round_label], opponent))
+        current_round = (data.get("current_round") or "").strip() or (
+            ROUND_LIST[history[-1][0]] if history and not errors else None
         )
+        if current_round is None:
+            pass  # no round given and the fights are invalid (already reported)
+        elif current_round not in ROUND_INDEX:
+            errors.append(f"Invalid round '{current_round}'. Must be one of {ROUND_LIST}")
+        elif history and ROUND_INDEX[current_round] < history[-1][0]:
+            errors.append("'current_round' is before the last fight")
+        if not isinstance(eliminated, list) or not all(name in PLAYER_IDS for name in eliminated):
+            errors.append(f"'eliminated' must be a list of players from {ALL_PLAYERS}")
+        if errors:
+            return jsonify({"success": False, "errors": errors}), 400
 
-        next_round = get_next_round(current_round)
-
+        eliminated = set(eliminated)
+        round_idx = ROUND_INDEX[current_round]
+        models = model_snapshot  # one snapshot for the template and the fallback
+        answer = predict_schedule(player, round_idx, history, eliminated, models)
+        if answer is None:
+            answer = {
+                "template": None,
+                "schedule": [],
+                "next_predictions": predict_next_opponent(
+                    player, round_idx, history[-1][1],
+                    previous_opponent=history[-2][1] if len(history) > 1 else None,
+                    eliminated=eliminated,
+                    models=models,
+                ),
+            }
         return jsonify({
             "success": True,
             "player": player,
             "current_round": current_round,
-            "next_round": next_round,
-            "last_opponent": last_opponent,
-            "previous_opponent": previous_opponent,
+            "next_round": get_next_round(current_round),
             "eliminated": sorted(eliminated),
-            "alive_count": len(ALL_PLAYERS) - len(eliminated),
-            "next_predictions": preds,
-            "timestamp": datetime.now().isoformat(),
+            "source": "model" if answer["template"] is None else "template",
+            **answer,
         })
 
     except Exception:
-        log.exception("Prediction error")
+        log.exception("Schedule prediction error")
         return jsonify({"success": False, "error": "Internal server error"}), 500
 
 
+@app.route("/api/predict-bulk", methods=["POST"])
+def predict_bulk():
+    """Score many independent contexts in one vectorised pass.
+
+    Request body:
+        queries — [<an /api/predict body>, ...]  (at most BULK_PREDICT_LIMIT)
+
+    Results are returned in input order. An invalid query gets
+    {"success": false, "errors": [...]} in its slot without failing the rest.
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        queries = data.get("queries") if isinstance(data, dict) else None
+        if not isinstance(queries, list):
+            return jsonify({"success": False, "error": "'queries' must be a list"}), 400
+        if len(queries) > BULK_PREDICT_LIMIT:
+            return jsonify({"success": False, "error": f"At most {BULK_PREDICT_LIMIT} queries per call"}), 413
+
+        results = prediction_results([parse_prediction_query(q) for q in queries])
+        return jsonify({"success": True, "count": len(results), "results": results})
+
+    except Exception:
+        log.exception("Bulk prediction error")
+        return jsonify({"success": False, "error": "Internal server error"}), 500
+
+
+@app.route("/api/predict-stream", methods=["POST"])
+def predict_stream():
+    """Score a newline-delimited JSON stream of /api/predict bodies.
+
+    Each non-blank input line is one query. Output is NDJSON with one result
+    per query line, in order. Bad lines get {"success": false, ...} and the
+    stream carries on. Queries are scored STREAM_BATCH_SIZE at a time and
+    each batch is written out before more input is read, so memory stays
+    constant however long the stream is.
+    One model snapshot serves the whole stream.
+    """
+    stream = request.stream
+    scorer = PredictionStream(model_snapshot)
+
+    def generate():
+        try:
+            for line in stream:
+                output = scorer.feed(line)
+                if output:
+                    yield output
+            if scorer.batch:
+                yield scorer.flush()
+        except Exception:
+            # Headers are already sent, so report in-band and stop
+            log.exception("Streaming prediction error")
+            yield app.json.dumps({"success": False, "error": "Internal server error"}) + "\n"
+
+    return app.response_class(stream_with_context(generate()), mimetype="application/x-ndjson")
+
+
 @app.route("/api/predict-batch", methods=["POST"])
 def predict_batch():
     """Predict for a sequence of rounds (full match chain).
@@ -549,53 +3175,214 @@ def predict_batch():
         player  — e.g. "Player 1"
         history — [{"round": "I-2", "opponent": "Player 3"}, ...]
     """
+    body, status = predict_batch_response(request.get_json(silent=True))
+    return app.response_class(body, status=status, mimetype=app.json.mimetype)
+
+
+@app.route("/api/rebuild-models", methods=["POST"])
+def rebuild_models():
+    """Admin endpoint: rebuild models from CSVs in the background.
+
+    Responds 202 immediately with the job's status. A request made while a
+    rebuild is running joins that job rather than starting another.
+    """
     try:
-        data = request.get_json(silent=True) or {}
-        player = (data.get("player") or "").strip()
-        history: List[dict] = data.get("history", [])
+        job, started = start_rebuild()
+        return jsonify({"success": True, "joined": not started, "job": job.status()}), 202
+    except Exception:
+        log.exception("Could not start model rebuild")
+        return jsonify({"success": False, "error": "Rebuild failed"}), 500
 
-        if not player:
-            return jsonify({"success": False, "error": "'player' is required"}), 400
-        if player not in ALL_PLAYERS:
-            return jsonify({"success": False, "error": f"Invalid player '{player}'"}), 400
 
-        results = predict_chain(player, history)
+@app.route("/api/rebuild-models", methods=["GET"])
+def rebuild_status():
+    """Status of the latest rebuild: state, current phase, progress, phase timings."""
+    job = rebuild_job
+    if job is None:
+        return jsonify({"success": False, "error": "No rebuild has been started"}), 404
+    return jsonify({"success": True, "job": job.status()})
+
+
+@app.route("/api/matches", methods=["POST"])
+def add_match():
+    """Ingest one tracked match and learn from it immediately.
+
+    Request body: the match as CSV in the Template Match.csv layout
+    (Content-Type: text/csv), or JSON {"csv": "<that CSV text>"}.
+
+    The match is validated, saved as the next Match-N.csv so restarts keep
+    it, and its counts are added to the live models without a full rebuild.
+    """
+    try:
+        data = request.get_json(silent=True)
+        csv_text = data.get("csv") if isinstance(data, dict) else request.get_data(as_text=True)
+        if not isinstance(csv_text, str) or not csv_text.strip():
+            return jsonify({"success": False, "error": "Match CSV is required"}), 400
+
+        try:
+            df = pd.read_csv(io.StringIO(csv_text))
+        except (pd.errors.ParserError, pd.errors.EmptyDataError) as e:
+            return jsonify({"success": False, "error": f"Could not parse CSV: {e}"}), 400
+
+        errors = validate_match(df)
+        if errors:
+            return jsonify({"success": False, "errors": errors}), 400
+
+        counts = count_match(encode_match(clean_dataframe(df)))
+        with model_writer():
+            path = save_match_file(csv_text)
+            fp = fingerprint_file(path)
+            save_match_counts(counts, fp["sha256"])
+            models = ingest_match(Path(path).name)
+            save_models(models)
+
         return jsonify({
             "success": True,
-            "player": player,
-            "predictions_history": results,
-        })
+            "file": Path(path).name,
+            "matches_loaded": models.match_count,
+            "model_version": models.version,
+            "transition_entries": len(models.transition_model),
+            "position_entries": len(models.position_model),
+            "bigram_entries": len(models.bigram_model),
+        }), 201
 
     except Exception:
-        log.exception("Batch prediction error")
+        log.exception("Match ingestion error")
         return jsonify({"success": False, "error": "Internal server error"}), 500
 
 
-@app.route("/api/rebuild-models", methods=["POST"])
-def rebuild_models():
-    """Admin endpoint: force model rebuild from CSVs and re-cache."""
-    global transition_model, position_model, bigram_model, player_survival, round_alive_estimates, match_count
+@app.route("/api/sessions", methods=["POST"])
+def create_session():
+    """Start tracking a game. Request body: {"player": "Player 1"}."""
+    data = request.get_json(silent=True) or {}
+    player = (data.get("player") or "").strip() if isinstance(data, dict) else ""
+    if not player:
+        return jsonify({"success": False, "error": "'player' is required"}), 400
+    if player not in PLAYER_IDS:
+        return jsonify({"success": False, "error": f"Invalid player '{player}'"}), 400
+
+    session = session_store.create(player)
+    return jsonify({"success": True, "ttl_seconds": SESSION_TTL_SECONDS, **session.state()}), 201
+
+
+@app.route("/api/sessions/<session_id>", methods=["GET"])
+def get_session(session_id: str):
+    session = session_store.get(session_id)
+    if session is None:
+        return jsonify({"success": False, "error": "Unknown or expired session"}), 404
+    return jsonify({"success": True, **session.state()})
+
+
+@app.route("/api/sessions/<session_id>", methods=["DELETE"])
+def delete_session(session_id: str):
+    if not session_store.delete(session_id):
+        return jsonify({"success": False, "error": "Unknown or expired session"}), 404
+    event_hub.publish(session_id, "end", {"session_id": session_id})
+    return jsonify({"success": True, "session_id": session_id})
+
+
+@app.route("/api/sessions/<session_id>/rounds", methods=["POST"])
+def add_session_round(session_id: str):
+    """Record one round of a tracked game and return the next prediction.
+
+    Request body:
+        round      — e.g. "III-4"; must come after the session's current round (else 409)
+        opponent   — who the player just faced (omit for creep rounds)
+        eliminated (optional) — players newly knocked out, e.g. ["Player 2"]
+    """
     try:
-        matches = load_training_data()
-        transition_model, position_model, bigram_model, player_survival = build_models(matches)
-        round_alive_estimates = compute_round_alive_estimates(player_survival)
-        match_count = len(matches)
-        save_models()
-        return jsonify({
-            "success": True,
-            "matches_reloaded": match_count,
-            "transition_entries": len(transition_model),
-            "position_entries": len(position_model),
-            "bigram_entries": len(bigram_model),
-        })
+        session = session_store.get(session_id)
+        if session is None:
+            return jsonify({"success": False, "error": "Unknown or expired session"}), 404
+
+        data = request.get_json(silent=True) or {}
+        if not isinstance(data, dict):
+            return jsonify({"success": False, "error": "Body must be a JSON object"}), 400
+        round_label = (data.get("round") or "").strip()
+        opponent = (data.get("opponent") or "").strip() or None
+        eliminated = data.get("eliminated") or []
+
+        errors = []
+        if round_label not in ROUND_INDEX:
+            errors.append(f"Invalid round '{round_label}'. Must be one of {ROUND_LIST}")
+        if opponent is not None and (opponent not in PLAYER_IDS or opponent == session.player):
+            errors.append(f"Invalid opponent '{opponent}'")
+        if not isinstance(eliminated, list) or not all(name in PLAYER_IDS for name in eliminated):
+            errors.append(f"'eliminated' must be a list of players from {ALL_PLAYERS}")
+        if errors:
+            return jsonify({"success": False, "errors": errors}), 400
+
+        with session.lock:
+            if session.current_round and ROUND_INDEX[round_label] <= ROUND_INDEX[session.current_round]:
+                return jsonify({
+                    "success": False,
+                    "error": f"Round '{round_label}' does not follow '{session.current_round}'",
+                }), 409
+            session.record_round(round_label, opponent, eliminated)
+            session.predictions = predict_for_session(session)
+            state = session.state()
+            event_hub.publish(session.id, "prediction", state)
+        return jsonify({"success": True, **state})
+
     except Exception:
-        log.exception("Model rebuild failed")
-        return jsonify({"success": False, "error": "Rebuild failed"}), 500
+        log.exception("Session update error")
+        return jsonify({"success": False, "error": "Internal server error"}), 500
+
+
+@app.route("/api/sessions/<session_id>/events", methods=["GET"])
+def session_events(session_id: str):
+    """Server-Sent Events for a tracked game.
+
+    Sends the session's state as a "prediction" event on subscribe and after
+    every recorded round, a "model" event whenever a new model is published,
+    a comment heartbeat when idle (which also keeps the session alive), and
+    an "end" event once the session is deleted or expires.
+
+    Here each open stream holds one server thread for its lifetime, so a
+    worker serves at most SSE_MAX_SUBSCRIBERS streams (503 beyond that) and
+    should run with more threads than that. asgi.py answers this route on
+    its event loop instead.
+    """
+    session = session_store.get(session_id)
+    if session is None:
+        return jsonify({"success": False, "error": "Unknown or expired session"}), 404
+
+    sub = event_hub.subscribe(session_id)
+    if sub is None:
+        response = jsonify({"success": False, "error": "Too many open event streams"})
+        response.headers["Retry-After"] = str(SSE_HEARTBEAT_SECONDS)
+        return response, 503
+    with session.lock:
+        sub.push("prediction", session.state())
+
+    def generate():
+        try:
+            yield f"retry: {SSE_HEARTBEAT_SECONDS * 1000}\n\n"
+            while True:
+                try:
+                    message = sub.queue.get(timeout=SSE_HEARTBEAT_SECONDS)
+                except queue.Empty:
+                    if session_store.get(session_id) is None:
+                        yield f"event: end\ndata: {app.json.dumps({'session_id': session_id})}\n\n"
+                        return
+                    yield ": heartbeat\n\n"
+                    continue
+                yield message
+                if message.startswith("event: end\n"):
+                    return
+        finally:
+            event_hub.unsubscribe(session_id, sub)
+
+    return app.response_class(
+        generate(),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 @app.route("/", methods=["GET"])
 def root():
-    return jsonify({
+    return cached_json("root", None, lambda: {
         "name": "Magic Chess Go Go — Opponent Predictor API",
         "version": "2.0.0",
         "endpoints": {
@@ -603,9 +3390,21 @@ def root():
             "GET  /api/players": "List all players",
             "GET  /api/rounds": "List all round labels",
             "GET  /api/stats": "Model statistics",
+            "GET  /api/stats/runtime": "Live serving counters of this worker",
             "POST /api/predict": "Predict next opponent",
             "POST /api/predict-batch": "Batch predict for a full match",
-            "POST /api/rebuild-models": "Force model rebuild from CSVs",
+            "POST /api/predict-bulk": "Predict many independent contexts in one call",
+            "POST /api/predict-stream": "Predict an NDJSON stream of queries, streamed back",
+            "POST /api/predict-lobby": "Predict every player's next opponent, consistently",
+            "POST /api/predict-schedule": "Predict the remaining full-lobby schedule from the fights so far",
+            "POST /api/matches": "Add one match (Template Match.csv layout)",
+            "POST /api/sessions": "Start tracking a game for a player",
+            "POST /api/sessions/<id>/rounds": "Record a round and get the next prediction",
+            "GET  /api/sessions/<id>": "Current state of a tracked game",
+            "DELETE /api/sessions/<id>": "Stop tracking a game",
+            "GET  /api/sessions/<id>/events": "Server-Sent Events for a tracked game",
+            "POST /api/rebuild-models": "Start a background model rebuild from CSVs",
+            "GET  /api/rebuild-models": "Status of the latest model rebuild",
             "GET  /": "This documentation",
         },
     })
@@ -615,55 +3414,174 @@ def root():
 #  STARTUP
 # ═══════════════════════════════════════════════════════════════════════════
 
-def initialize():
-    """Try loading cached models; fall back to rebuilding from CSVs."""
-    global transition_model, position_model, bigram_model, player_survival, round_alive_estimates, match_count
+def install_models(
+    transition: np.ndarray,
+    position: np.ndarray,
+    bigram: np.ndarray,
+    matching: np.ndarray,
+    rematch: np.ndarray,
+    cycle: np.ndarray,
+    survival: np.ndarray,
+    manifest: Dict[str, dict],
+    alive: Optional[np.ndarray] = None,
+) -> ModelSnapshot:
+    """Derive every serving structure from count tensors and publish it."""
+    return publish_snapshot(build_snapshot(transition, position, bigram, matching, rematch, cycle, survival, manifest, alive))
+
+
+def build_snapshot(
+    transition: np.ndarray,
+    position: np.ndarray,
+    bigram: np.ndarray,
+    matching: np.ndarray,
+    rematch: np.ndarray,
+    cycle: np.ndarray,
+    survival: np.ndarray,
+    manifest: Dict[str, dict],
+    alive: Optional[np.ndarray] = None,
+) -> ModelSnapshot:
+    """Derive every serving structure from count tensors, without publishing.
+
+    *alive* may carry the [round, seat] alive counts when the caller already
+    has them, which saves a pass over *survival*.
+    """
+    alive = count_alive(survival) if alive is None else alive
+    estimates = compute_round_alive_estimates(alive, len(survival))
+    tm = build_tensor_models(
+        transition, position, bigram, matching, rematch, cycle, estimates, smallest_lobby_sizes(survival),
+    )
+    return make_snapshot(tm, build_prediction_table(tm), survival, alive, manifest)
+
+
+def publish_snapshot(models: ModelSnapshot) -> ModelSnapshot:
+    """Make *models* live with a single reference swap."""
+    global model_snapshot
+    model_snapshot = models
+    prediction_cache.clear()
+    event_hub.broadcast("model", {"model_version": models.version, "matches_loaded": models.match_count})
+    return models
+
+
+def ingest_match(name: str) -> ModelSnapshot:
+    """Fold a newly saved match file into the published models without re-counting the corpus.
 
+    Call under model_writer(), once the file and its counts are saved. The
+    base is the model the version marker points at (this worker's own when
+    it is the one published), moved to the match files now on disk by
+    apply_manifest_delta. Any match another worker saved but has not yet
+    folded in is picked up with this one, so none is dropped. Only changed
+    files' cached contributions are applied, so the cost does not depend
+    on how many matches are loaded.
+    """
+    current = model_snapshot
     cached = load_models()
-    if cached:
-        transition_model = defaultdict(Counter, {
-            tuple(k) if isinstance(k, tuple) else k: Counter(v)
-            for k, v in cached["transition_model"].items()
-        })
-        position_model = defaultdict(Counter, {
-            tuple(k) if isinstance(k, tuple) else k: Counter(v)
-            for k, v in cached["position_model"].items()
-        })
-        bigram_model = defaultdict(Counter, {
-            tuple(k) if isinstance(k, tuple) else k: Counter(v)
-            for k, v in cached["bigram_model"].items()
-        })
-        player_survival = cached.get("player_survival", [])
-        round_alive_estimates = cached.get("round_alive_estimates", {})
-        if not round_alive_estimates and player_survival:
-            log.info("Computing alive estimates from survival data…")
-            round_alive_estimates = compute_round_alive_estimates(player_survival)
-        match_count = len(player_survival)
+    if cached is not None and cached["header"].get("version") != current.version:
+        base, base_manifest = artifact_counts(cached), cached["header"]["manifest"]
     else:
-        log.info("No cache found — building models from CSV files…")
-        matches = load_training_data()
-        transition_model, position_model, bigram_model, player_survival = build_models(matches)
-        round_alive_estimates = compute_round_alive_estimates(player_survival)
-        match_count = len(matches)
-        save_models()
+        tm = current.tensors
+        base = (tm.transition, tm.position, tm.bigram, tm.matching, tm.rematch, tm.cycle, current.player_survival)
+        base_manifest = current.manifest
+    updated = apply_manifest_delta(base, base_manifest, scan_match_files(previous=base_manifest))
+    if updated is None or name not in updated[-1]:
+        raise RuntimeError(f"Match {name} could not be added to the published model")
+    return install_models(*updated)
+
+
+@app.before_request
+def check_for_new_model() -> None:
+    """Reload in the background if another process published a newer model.
+
+    Called before every request but throttled: the version marker is
+    stat'ed at most once per MODEL_CHECK_INTERVAL_MS, and read only when
+    its inode or mtime changed, so requests do no disk I/O in between.
+    """
+    global next_model_check
+    now = time.monotonic()
+    if now < next_model_check:
+        return
+    next_model_check = now + MODEL_CHECK_INTERVAL_MS / 1000
+    try:
+        st = os.stat(os.path.join(MODEL_ARTIFACT_DIR, MODEL_VERSION_MARKER))
+    except OSError:
+        return
+    marker = (st.st_ino, st.st_mtime_ns)
+    if marker != marker_seen and reload_lock.acquire(blocking=False):
+        threading.Thread(target=reload_published_model, args=(marker,), name="model-reload", daemon=True).start()
+
+
+def reload_published_model(marker: Tuple[int, int]) -> None:
+    """Map the marker's artifact and publish it, unless it is already live."""
+    global marker_seen
+    try:
+        cached = load_models()
+        if cached is None:
+            return
+        version = cached["header"].get("version")
+        if version != model_snapshot.version:
+            models = publish_snapshot(snapshot_from_artifact(cached))
+            log.info("Reloaded model %s (%d matches) published by another process", version, models.match_count)
+        marker_seen = marker
+    except Exception:
+        log.exception("Model reload failed")
+    finally:
+        reload_lock.release()
+
+
+def initialize():
+    """Load cached models if their inputs are unchanged; otherwise update them.
+
+    The cache records a manifest of the match files it was built from. When
+    files were added, modified or removed, their per-file contributions are
+    added to / subtracted from the cached totals; only files with no cached
+    contribution are parsed.
+
+    All of it runs under model_writer(), so a worker starting while another
+    ingests a match cannot publish a model without that match. Workers
+    starting together also wait for the first one's build and then just
+    map it.
+    """
+    with model_writer():
+        cached = load_models()
+        old_manifest = cached["header"]["manifest"] if cached else {}
+        manifest = scan_match_files(previous=old_manifest)
+
+        if cached and not manifest_changed(old_manifest, manifest):
+            models = publish_snapshot(snapshot_from_artifact(cached, manifest))
+            if manifest != old_manifest:
+                save_models(models)  # same content, refreshed mtimes
+        else:
+            updated = None
+            if cached:
+                log.info("Match files changed — updating cached models…")
+                updated = apply_manifest_delta(artifact_counts(cached), old_manifest, manifest)
+            if updated is not None:
+                models = install_models(*updated)
+            else:
+                log.info("Building models from CSV files…")
+                manifest, counts = load_training_data(manifest=manifest)
+                models = install_models(*combine_match_counts(counts), manifest)
+            save_models(models)
 
     log.info(
-        "Ready: %d matches | %d transition rules | %d position rules | %d bigram rules | %d round estimates",
-        match_count,
-        len(transition_model),
-        len(position_model),
-        len(bigram_model),
-        len(round_alive_estimates),
+        "Ready: model %s | %d matches | %d transition rules | %d position rules | %d bigram rules "
+        "| %d round estimates | %d tabled predictions",
+        models.version,
+        models.match_count,
+        len(models.transition_model),
+        len(models.position_model),
+        len(models.bigram_model),
+        len(models.round_alive_estimates),
+        models.table.entries,
     )
 
 
-# Module-level globals (populated at startup)
-transition_model: Dict[Tuple[str, str], Counter] = {}
-position_model: Dict[Tuple[str, int], Counter] = {}
-bigram_model: Dict[Tuple[str, str, str], Counter] = {}
-player_survival: List[dict] = []
-round_alive_estimates: Dict[int, set] = {}
-match_count: int = 0
+# The live model (populated at startup, replaced wholesale on rebuild/ingest)
+model_snapshot: Optional[ModelSnapshot] = None
+
+# Cross-process reload state: last version-marker (inode, mtime) acted upon
+marker_seen: Optional[Tuple[int, int]] = None
+next_model_check = 0.0
+reload_lock = threading.Lock()
 
 initialize()
 
@@ -0,0 +1,227 @@
+"""
+ASGI entry point for high-concurrency serving.
+
+    uvicorn asgi:application --host 0.0.0.0 --port 5000
+
+The hot prediction routes are answered on the event loop. Scoring takes
+microseconds, so it runs inline with no thread hop, and a slow client only
+holds a coroutine, never a worker thread. The long-lived routes are native
+too. A session's event stream waits on the event loop for its next event,
+and /api/predict-stream reads and answers its body incrementally. Both
+would otherwise pin a thread of asgiref's single-threaded WSGI executor for
+the life of the connection, stalling every delegated request, and asgiref
+buffers a streamed request body whole. Every other route (and CORS
+preflight) is handed to the Flask app through asgiref's WSGI adapter, so
+the request/response schema is identical in both serving modes.
+"""
+
+import asyncio
+import json
+import queue
+import re
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+from asgiref.wsgi import WsgiToAsgi
+
+import app as backend
+
+# Largest request body read for a natively served route (and longest
+# /api/predict-stream line)
+MAX_BODY_BYTES = 1 << 20
+
+flask_application = WsgiToAsgi(backend.app)
+
+# (method, path) → framework-free handler: parsed JSON body → (bytes, status)
+NATIVE_ROUTES: Dict[Tuple[str, str], Callable[[Optional[dict]], Tuple[bytes, int]]] = {
+    ("POST", "/api/predict"): lambda data: backend.predict_response(data, coalesce=False),
+    ("POST", "/api/predict-batch"): backend.predict_batch_response,
+}
+
+EVENTS_PATH = re.compile(r"/api/sessions/([^/]+)/events")
+
+
+async def read_body(receive: Callable[[], Awaitable[dict]]) -> Optional[bytes]:
+    """Read the whole request body, or None if it exceeds MAX_BODY_BYTES."""
+    chunks: List[bytes] = []
+    size = 0
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            return None
+        chunk = message.get("body", b"")
+        size += len(chunk)
+        if size > MAX_BODY_BYTES:
+            return None
+        chunks.append(chunk)
+        if not message.get("more_body"):
+            return b"".join(chunks)
+
+
+def parse_json(headers: Dict[bytes, bytes], body: bytes) -> Optional[dict]:
+    """Mirror Flask's request.get_json(silent=True): None unless a valid JSON body."""
+    content_type = headers.get(b"content-type", b"").split(b";")[0].strip().lower()
+    if content_type != b"application/json" and not content_type.endswith(b"+json"):
+        return None
+    try:
+        return json.loads(body)
+    except ValueError:
+        return None
+
+
+def response_start(
+    status: int,
+    content_type: str,
+    origin: Optional[str],
+    extra: Iterable[Tuple[str, str]] = (),
+) -> dict:
+    """An http.response.start message with the headers Flask and flask_cors would send."""
+    headers = [(b"content-type", content_type.encode())]
+    headers += [(name.lower().encode(), value.encode("latin-1")) for name, value in extra]
+    headers += [(name.lower().encode(), value.encode("latin-1")) for name, value in backend.cors_headers(origin)]
+    return {"type": "http.response.start", "status": status, "headers": headers}
+
+
+async def send_json(
+    send: Callable,
+    body: bytes,
+    status: int,
+    origin: Optional[str],
+    extra: Iterable[Tuple[str, str]] = (),
+) -> None:
+    extra = [("Content-Length", str(len(body))), *extra]
+    await send(response_start(status, backend.app.json.mimetype, origin, extra))
+    await send({"type": "http.response.body", "body": body})
+
+
+async def wait_for_disconnect(receive: Callable[[], Awaitable[dict]]) -> None:
+    """Return once the client has gone (the request body is discarded)."""
+    while (await receive())["type"] != "http.disconnect":
+        pass
+
+
+async def session_events(session_id: str, origin: Optional[str], receive: Callable, send: Callable) -> None:
+    """GET /api/sessions/<id>/events, as app.session_events but waiting on the event loop.
+
+    Publishers push from any thread, so the subscription wakes this
+    coroutine through call_soon_threadsafe. The same SSE_MAX_SUBSCRIBERS
+    cap applies, to bound per-worker memory rather than threads.
+    """
+    session = backend.session_store.get(session_id)
+    if session is None:
+        body = backend.json_bytes({"success": False, "error": "Unknown or expired session"})
+        await send_json(send, body, 404, origin)
+        return
+
+    loop = asyncio.get_running_loop()
+    wake = asyncio.Event()
+    sub = backend.event_hub.subscribe(session_id, notify=lambda: loop.call_soon_threadsafe(wake.set))
+    if sub is None:
+        body = backend.json_bytes({"success": False, "error": "Too many open event streams"})
+        await send_json(send, body, 503, origin, [("Retry-After", str(backend.SSE_HEARTBEAT_SECONDS))])
+        return
+
+    disconnect = asyncio.ensure_future(wait_for_disconnect(receive))
+    try:
+        with session.lock:
+            sub.push("prediction", session.state())
+        await send(response_start(
+            200, "text/event-stream; charset=utf-8", origin,
+            [("Cache-Control", "no-cache"), ("X-Accel-Buffering", "no")],
+        ))
+        message = f"retry: {backend.SSE_HEARTBEAT_SECONDS * 1000}\n\n"
+        await send({"type": "http.response.body", "body": message.encode(), "more_body": True})
+        while True:
+            wake.clear()
+            try:
+                message = sub.queue.get_nowait()
+            except queue.Empty:
+                waiter = asyncio.ensure_future(wake.wait())
+                done, _ = await asyncio.wait(
+                    {waiter, disconnect},
+                    timeout=backend.SSE_HEARTBEAT_SECONDS,
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+                waiter.cancel()
+                if disconnect in done:
+                    return
+                if waiter in done:
+                    continue
+                if backend.session_store.get(session_id) is None:
+                    message = f"event: end\ndata: {backend.app.json.dumps({'session_id': session_id})}\n\n"
+                else:
+                    message = ": heartbeat\n\n"
+            if message.startswith("event: end\n"):
+                await send({"type": "http.response.body", "body": message.encode()})
+                return
+            await send({"type": "http.response.body", "body": message.encode(), "more_body": True})
+    finally:
+        disconnect.cancel()
+        backend.event_hub.unsubscribe(session_id, sub)
+
+
+async def predict_stream(origin: Optional[str], receive: Callable, send: Callable) -> None:
+    """POST /api/predict-stream, as app.predict_stream but reading the body as it arrives.
+
+    Complete lines are scored (see app.PredictionStream) and each finished
+    batch is sent before more input is awaited.
+    """
+    scorer = backend.PredictionStream(backend.model_snapshot)
+    await send(response_start(200, "application/x-ndjson", origin))
+    buffer = b""
+    try:
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                return
+            *lines, buffer = (buffer + message.get("body", b"")).split(b"\n")
+            if not message.get("more_body"):
+                output = "".join(scorer.feed(line) for line in [*lines, buffer]) + scorer.flush()
+                break
+            output = "".join(scorer.feed(line) for line in lines)
+            if len(buffer) > MAX_BODY_BYTES:
+                error = {"success": False, "error": f"Line longer than {MAX_BODY_BYTES} bytes"}
+                output += scorer.flush() + backend.app.json.dumps(error) + "\n"
+                break
+            if output:
+                await send({"type": "http.response.body", "body": output.encode(), "more_body": True})
+    except Exception:
+        # Headers are already sent, so report in-band and stop
+        backend.log.exception("Streaming prediction error")
+        output = backend.app.json.dumps({"success": False, "error": "Internal server error"}) + "\n"
+    await send({"type": "http.response.body", "body": output.encode()})
+
+
+async def application(scope: dict, receive: Callable, send: Callable) -> None:
+    if scope["type"] == "lifespan":
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    method, path = scope.get("method"), scope.get("path")
+    events = EVENTS_PATH.fullmatch(path) if scope["type"] == "http" and method == "GET" else None
+    stream = scope["type"] == "http" and (method, path) == ("POST", "/api/predict-stream")
+    handler = NATIVE_ROUTES.get((method, path))
+    if scope["type"] != "http" or (handler is None and events is None and not stream):
+        await flask_application(scope, receive, send)
+        return
+
+    backend.check_for_new_model()
+    headers = dict(scope["headers"])
+    origin = headers[b"origin"].decode("latin-1") if b"origin" in headers else None
+    if events is not None:
+        await session_events(events.group(1), origin, receive, send)
+        return
+    if stream:
+        await predict_stream(origin, receive, send)
+        return
+
+    raw = await read_body(receive)
+    if raw is None:
+        body, status = backend.json_bytes({"success": False, "error": "Request body too large"}), 413
+    else:
+        body, status = handler(parse_json(headers, raw))
+    await send_json(send, body, status, origin)
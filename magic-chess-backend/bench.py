@@ -0,0 +1,320 @@
+"""
+Micro-benchmarks for the prediction backend.
+
+Run from this directory (importing app loads the models):
+
+    python bench.py predict --queries 20000
+    python bench.py build --matches 100000
+    python bench.py wsgi --queries 20000
+    python bench.py parity
+    python bench.py rules
+
+The http benchmark drives an already running server, e.g. compare
+
+    gunicorn -w 1 -k gthread --threads 16 -b :5000 app:app
+    uvicorn asgi:application --port 5000
+
+with `python bench.py http --port 5000 --slow 200`; --slow holds connections
+open by trickling a request body, like mobile clients on bad networks.
+"""
+
+import argparse
+import asyncio
+import io
+import json
+import random
+import re
+import time
+from typing import Callable, List, Tuple
+
+import numpy as np
+
+import app
+
+
+def random_contexts(n: int, seed: int = 0) -> List[Tuple]:
+    """Generate n random (player, round_idx, last, previous, eliminated) contexts."""
+    rng = random.Random(seed)
+    contexts = []
+    for _ in range(n):
+        player = rng.choice(app.ALL_PLAYERS)
+        others = [p for p in app.ALL_PLAYERS if p != player]
+        last, prev = rng.sample(others, 2)
+        eliminated = set(rng.sample(others, rng.choice((0, 0, 0, 1, 2))))
+        contexts.append((player, rng.randrange(len(app.ROUND_LIST)), last, prev, eliminated))
+    return contexts
+
+
+def time_calls(fn: Callable, contexts: List[Tuple]) -> float:
+    """Return mean microseconds per call of fn over contexts."""
+    start = time.perf_counter()
+    for ctx in contexts:
+        fn(*ctx)
+    return (time.perf_counter() - start) / len(contexts) * 1e6
+
+
+def bench_predict(args: argparse.Namespace) -> None:
+    contexts = random_contexts(args.queries)
+    backends = {
+        "dict": app.predict_next_opponent_dict,
+        "tensor": app.predict_next_opponent_tensor,
+        "table": lambda player, idx, last, prev, _elim: app.lookup_prediction(player, idx, last, prev),
+    }
+    for name, fn in backends.items():
+        time_calls(fn, contexts[:1000])  # warm-up
+        print(f"{name:>8}: {time_calls(fn, contexts):8.2f} µs/query")
+
+    ids = lambda names: np.array([app.PLAYER_IDS[n] for n in names])
+    players, rounds, lasts, prevs, elims = zip(*contexts)
+    players, lasts, prevs = ids(players), ids(lasts), ids(prevs)
+    rounds = np.array(rounds)
+    masks = np.array([app.eliminated_mask(e) for e in elims], dtype=np.uint8)
+    start = time.perf_counter()
+    scores, order = app.predict_next_opponent_many(players, rounds, lasts, prevs, masks)
+    scored = time.perf_counter()
+    app.format_many(players, rounds, scores, order)
+    done = time.perf_counter()
+    per_query = lambda seconds: seconds / len(contexts) * 1e6
+    print(f"{'bulk':>8}: {per_query(done - start):8.2f} µs/query "
+          f"({per_query(scored - start):.2f} scoring + {per_query(done - scored):.2f} formatting)")
+
+
+def bench_parity(args: argparse.Namespace) -> None:
+    """Check that every scoring path answers every context identically.
+
+    Covers each (player, round, last, previous) context with no eliminations
+    and with each single other player eliminated. The table only holds
+    no-elimination contexts. Exits non-zero on any mismatch.
+    """
+    names = [None] + app.ALL_PLAYERS
+    contexts = [
+        (player, idx, last, prev, eliminated)
+        for player in app.ALL_PLAYERS
+        for idx in range(len(app.ROUND_LIST))
+        for last in app.ALL_PLAYERS
+        for prev in names
+        for eliminated in [set()] + [{p} for p in app.ALL_PLAYERS if p != player]
+    ]
+    bulk = app.predict_queries([(p, app.ROUND_LIST[idx], last, prev, e) for p, idx, last, prev, e in contexts])
+
+    mismatches = {"dict": 0, "table": 0, "bulk": 0}
+    for ctx, from_bulk in zip(contexts, bulk):
+        player, idx, last, prev, eliminated = ctx
+        expected = app.predict_next_opponent_tensor(*ctx)
+        mismatches["dict"] += app.predict_next_opponent_dict(*ctx) != expected
+        mismatches["bulk"] += from_bulk != expected
+        if not eliminated:
+            mismatches["table"] += app.lookup_prediction(player, idx, last, prev) != expected
+    print(f"{len(contexts)} contexts vs tensor backend: "
+          + ", ".join(f"{name} {count} mismatched" for name, count in mismatches.items()))
+    if any(mismatches.values()):
+        raise SystemExit(1)
+
+
+def bench_rules(args: argparse.Namespace) -> None:
+    """Backtest the rematch rules on the corpus's own fights.
+
+    Each fight after a seat's first is checked against the opponents
+    forbidden_opponents rules out for it. That is done once with the seats
+    eliminated by then (no fights left in the match) and once with
+    eliminations omitted, as API callers may; the no-elimination prediction
+    table is built the second way. Exits non-zero if either rules out the
+    opponent actually faced in more than REMATCH_TOLERANCE of fights.
+    """
+    tm = app.model_snapshot.tensors
+    late = app.ROUND_INDEX["IV-5"]
+    checked = {"eliminations given": [0, 0], "eliminations omitted": [0, 0], "omitted, from IV-5": [0, 0]}
+    for filepath in app.discover_match_files():
+        m = app.load_match_file(filepath)
+        if m is None:
+            continue
+        for seat in range(app.NUM_PLAYERS):
+            fights = [(r, int(m[r, seat])) for r in range(len(app.ROUND_LIST)) if m[r, seat]]
+            for k in range(1, len(fights)):
+                r, faced = fights[k]
+                last, prev = fights[k - 1][1], fights[k - 2][1] if k >= 2 else 0
+                gone = sum(1 << s for s in range(app.NUM_PLAYERS) if not m[r:, s].any())
+                for label, eliminated in (("eliminations given", gone), ("eliminations omitted", 0)):
+                    ruled_out = app.forbidden_opponents(tm, seat + 1, r, last, prev, eliminated) >> (faced - 1) & 1
+                    labels = [label] + (["omitted, from IV-5"] if not eliminated and r >= late else [])
+                    for name in labels:
+                        checked[name][0] += ruled_out
+                        checked[name][1] += 1
+    print(", ".join(f"{name}: {bad}/{total} faced opponents ruled out" for name, (bad, total) in checked.items()))
+    if any(bad > app.REMATCH_TOLERANCE * total for bad, total in checked.values()):
+        raise SystemExit(1)
+
+
+def synthetic_matches(n: int, seed: int = 0) -> np.ndarray:
+    """Generate n encoded matches: random pairings, Creep rounds, eliminations."""
+    rng = np.random.default_rng(seed)
+    num_rounds = len(app.ROUND_LIST)
+    creep = [app.ROUND_LIST.index(r) for r in ("I-1", "II-3", "III-3", "IV-3", "V-3")]
+    matches = np.zeros((n, num_rounds, app.NUM_PLAYERS), dtype=np.uint8)
+    seats = np.argsort(rng.random((n, num_rounds, app.NUM_PLAYERS)), axis=-1)
+    a, b = seats[..., 0::2], seats[..., 1::2]
+    np.put_along_axis(matches, a, (b + 1).astype(np.uint8), axis=-1)
+    np.put_along_axis(matches, b, (a + 1).astype(np.uint8), axis=-1)
+    matches[:, creep] = 0
+    # Each seat is eliminated after a random round
+    last_round = rng.integers(12, num_rounds + 1, size=(n, 1, app.NUM_PLAYERS))
+    matches[np.arange(num_rounds)[None, :, None] >= last_round] = 0
+    return matches
+
+
+def bench_build(args: argparse.Namespace) -> None:
+    matches = synthetic_matches(args.matches)
+    start = time.perf_counter()
+    transition, position, bigram, matching, rematch, cycle, survival = app.build_models(matches)
+    counted = time.perf_counter()
+    alive = app.count_alive(survival)
+    estimates = app.compute_round_alive_estimates(alive, len(survival))
+    app.build_tensor_models(
+        transition, position, bigram, matching, rematch, cycle, estimates, app.smallest_lobby_sizes(survival),
+    )
+    app.build_dict_models(transition, position, bigram)
+    done = time.perf_counter()
+    print(f"{len(matches)} matches: count {counted - start:.2f}s, "
+          f"alive+tensors+dicts {done - counted:.2f}s, total {done - start:.2f}s")
+
+
+def predict_bodies(contexts: List[Tuple]) -> List[bytes]:
+    """/api/predict JSON bodies for random contexts."""
+    return [
+        json.dumps({
+            "player": player,
+            "current_round": app.ROUND_LIST[idx],
+            "last_opponent": last,
+            "previous_opponent": prev,
+            "eliminated": sorted(eliminated),
+        }).encode()
+        for player, idx, last, prev, eliminated in contexts
+    ]
+
+
+def http_request(host: str, body: bytes) -> bytes:
+    return (
+        b"POST /api/predict HTTP/1.1\r\nHost: %s\r\nContent-Type: application/json\r\n"
+        b"Content-Length: %d\r\n\r\n%s" % (host.encode(), len(body), body)
+    )
+
+
+async def http_client(host: str, port: int, requests: List[bytes], latencies: List[float]) -> None:
+    """Send *requests* one after another over a single keep-alive connection."""
+    reader, writer = await asyncio.open_connection(host, port)
+    for req in requests:
+        start = time.perf_counter()
+        writer.write(req)
+        head = await reader.readuntil(b"\r\n\r\n")
+        length = int(re.search(rb"content-length: *(\d+)", head, re.IGNORECASE).group(1))
+        await reader.readexactly(length)
+        latencies.append(time.perf_counter() - start)
+    writer.close()
+
+
+async def slow_client(host: str, port: int, stop: asyncio.Event) -> None:
+    """Hold a connection by sending a request body one byte per second."""
+    try:
+        reader, writer = await asyncio.open_connection(host, port)
+        writer.write(b"POST /api/predict HTTP/1.1\r\nHost: %s\r\nContent-Type: application/json\r\n"
+                     b"Content-Length: 1000000\r\n\r\n" % host.encode())
+        while not stop.is_set():
+            writer.write(b" ")
+            await writer.drain()
+            try:
+                await asyncio.wait_for(stop.wait(), 1)
+            except asyncio.TimeoutError:
+                pass
+        writer.close()
+    except OSError:
+        pass
+
+
+async def run_http(args: argparse.Namespace) -> None:
+    bodies = predict_bodies(random_contexts(args.requests))
+    requests = [http_request(args.host, body) for body in bodies]
+    stop = asyncio.Event()
+    slow = [asyncio.create_task(slow_client(args.host, args.port, stop)) for _ in range(args.slow)]
+    await asyncio.sleep(1 if slow else 0)
+
+    latencies: List[float] = []
+    start = time.perf_counter()
+    await asyncio.gather(*(
+        http_client(args.host, args.port, requests[i::args.concurrency], latencies)
+        for i in range(args.concurrency)
+    ))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await asyncio.gather(*slow)
+
+    latencies.sort()
+    pct = lambda q: latencies[min(len(latencies) - 1, int(q * len(latencies)))] * 1000
+    print(f"{len(latencies)} requests, {args.concurrency} clients, {args.slow} slow: "
+          f"{len(latencies) / elapsed:,.0f} req/s, p50 {pct(0.5):.2f} ms, p99 {pct(0.99):.2f} ms")
+
+
+def bench_http(args: argparse.Namespace) -> None:
+    asyncio.run(run_http(args))
+
+
+def time_wsgi(application: Callable, environs: List[dict]) -> float:
+    """Return mean microseconds per request of a WSGI app, body included."""
+    start_response = lambda status, headers: None
+    start = time.perf_counter()
+    for environ in environs:
+        environ["wsgi.input"].seek(0)
+        b"".join(application(environ, start_response))
+    return (time.perf_counter() - start) / len(environs) * 1e6
+
+
+def bench_wsgi(args: argparse.Namespace) -> None:
+    import wsgi
+    from werkzeug.test import EnvironBuilder
+
+    environs = [
+        EnvironBuilder(path="/api/predict", method="POST", data=body, content_type="application/json").get_environ()
+        for body in predict_bodies(random_contexts(args.queries))
+    ]
+    for environ in environs:
+        environ["wsgi.input"] = io.BytesIO(environ["wsgi.input"].read())
+    for name, application in (("flask", app.app), ("raw wsgi", wsgi.application)):
+        time_wsgi(application, environs)  # warm-up (fills the prediction cache)
+        print(f"{name:>8}: {time_wsgi(application, environs):8.2f} µs/request")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("predict", help="dict vs tensor vs table vs bulk prediction latency")
+    p.add_argument("--queries", type=int, default=20000)
+    p.set_defaults(func=bench_predict)
+
+    p = sub.add_parser("build", help="build_models on a synthetic corpus")
+    p.add_argument("--matches", type=int, default=100_000)
+    p.set_defaults(func=bench_build)
+
+    p = sub.add_parser("wsgi", help="Flask vs raw WSGI fast path for /api/predict, in-process")
+    p.add_argument("--queries", type=int, default=20000)
+    p.set_defaults(func=bench_wsgi)
+
+    p = sub.add_parser("parity", help="dict, table and bulk paths agree with the tensor backend")
+    p.set_defaults(func=bench_parity)
+
+    p = sub.add_parser("rules", help="backtest the rematch rules against the corpus's fights")
+    p.set_defaults(func=bench_rules)
+
+    p = sub.add_parser("http", help="requests/sec and p99 of /api/predict against a running server")
+    p.add_argument("--host", default="127.0.0.1")
+    p.add_argument("--port", type=int, default=5000)
+    p.add_argument("--requests", type=int, default=20000)
+    p.add_argument("--concurrency", type=int, default=64)
+    p.add_argument("--slow", type=int, default=0, help="extra connections that trickle a body")
+    p.set_defaults(func=bench_http)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""
+Raw WSGI entry point with a framework-free fast path for /api/predict.
+
+    gunicorn -w 4 -k gthread --threads 8 -b :5000 wsgi:application
+
+POST /api/predict is answered without Flask routing, request contexts or
+jsonify. The body is parsed, validated against the precomputed player and
+round sets, scored and written as bytes by the same predict_response the
+Flask route uses, so responses are byte-identical. Everything else (and
+any /api/predict request the fast path does not handle exactly as Flask
+would, such as a chunked body) is delegated to the Flask app.
+"""
+
+import json
+from typing import Callable, Iterable, Optional
+
+import app as backend
+
+# Largest body the fast path reads; larger requests go through Flask
+MAX_BODY_BYTES = 1 << 20
+
+JSON_CONTENT_TYPE = backend.app.json.mimetype
+STATUS_LINES = {200: "200 OK", 400: "400 BAD REQUEST", 500: "500 INTERNAL SERVER ERROR"}
+
+
+def parse_json(environ: dict, body: bytes) -> Optional[dict]:
+    """Mirror Flask's request.get_json(silent=True): None unless a valid JSON body."""
+    content_type = environ.get("CONTENT_TYPE", "").split(";")[0].strip().lower()
+    if content_type != "application/json" and not content_type.endswith("+json"):
+        return None
+    try:
+        return json.loads(body)
+    except ValueError:
+        return None
+
+
+def application(environ: dict, start_response: Callable) -> Iterable[bytes]:
+    if environ.get("PATH_INFO") != "/api/predict" or environ.get("REQUEST_METHOD") != "POST":
+        return backend.app(environ, start_response)
+    try:
+        length = int(environ.get("CONTENT_LENGTH") or -1)
+    except ValueError:
+        length = -1
+    if not 0 <= length <= MAX_BODY_BYTES:
+        return backend.app(environ, start_response)
+
+    backend.check_for_new_model()
+    body, status = backend.predict_response(parse_json(environ, environ["wsgi.input"].read(length)))
+    start_response(STATUS_LINES[status], [
+        ("Content-Type", JSON_CONTENT_TYPE),
+        ("Content-Length", str(len(body))),
+        *backend.cors_headers(environ.get("HTTP_ORIGIN")),
+    ])
+    return [body]